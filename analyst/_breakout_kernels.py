@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Shared array kernels and output helpers for the breakout analysis and database scripts."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import sys
+from operator import attrgetter
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def bars_to_soa(bars: Sequence) -> Tuple[np.ndarray, ...]:
+    """Unpack bars into contiguous date/high/low/close/volume arrays
+
+    Call this once on the full, date-sorted history; per-day checks then work
+    on prefix views such as ``closes[:end]`` rather than rebuilding arrays.
+    """
+    n = len(bars)
+    dates = np.fromiter((bar.timestamp.date() for bar in bars), dtype='datetime64[D]', count=n)
+    highs, lows, closes, volumes = (
+        np.fromiter(map(attrgetter(field), bars), dtype=np.float64, count=n)
+        for field in ("high", "low", "close", "volume"))
+    return dates, highs, lows, closes, volumes
+
+
+def rolling(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Trailing-window reduction aligned so out[i] covers values[i-window+1:i+1]"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=-1)
+    return out
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """True range per bar; the first bar is measured against its own close"""
+    prev = np.empty_like(closes)
+    prev[0] = closes[0]
+    prev[1:] = closes[:-1]
+    # Fold each gap into the result in place rather than stacking three temporaries
+    tr = highs - lows
+    gap = np.abs(highs - prev)
+    np.maximum(tr, gap, out=tr)
+    np.subtract(lows, prev, out=gap)
+    np.maximum(tr, np.abs(gap, out=gap), out=tr)
+    return tr
+
+
+def wilder_smooth(values: np.ndarray, period: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Wilder's running average of `values` (len(values) - period + 1 entries)
+
+    Seeded with the mean of the first `period` values, then
+    out[k] = (out[k-1] * (period - 1) + values[period - 1 + k]) / period.
+    The recursion is inherently sequential, so it runs as a plain loop.
+    """
+    if out is None:
+        out = np.empty(len(values) - period + 1)
+    avg = np.mean(values[:period])
+    out[0] = avg
+    for k, value in enumerate(values[period:].tolist(), 1):
+        avg = (avg * (period - 1) + value) / period
+        out[k] = avg
+    return out
+
+
+def window_atr14(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                 tr: np.ndarray) -> np.ndarray:
+    """14-bar ATR of each standalone window [j, j+14), given the true range `tr`
+
+    The first bar of a window has no prior close inside it, so its true range
+    is taken against its own close.
+    """
+    if len(closes) < 14:
+        return np.empty(0)
+    n_windows = len(closes) - 13
+    window_tr = np.empty((n_windows, 14))
+    window_tr[:, 0] = np.maximum.reduce([highs - lows, np.abs(highs - closes),
+                                         np.abs(lows - closes)])[:n_windows]
+    window_tr[:, 1:] = sliding_window_view(tr[1:], 13)
+    return window_tr.mean(axis=-1)
+
+
+def precompute_indicators(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                          volumes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute the rolling indicator series over the full history in one pass
+
+    Every series is causal, so row i only depends on bars up to i and each
+    day reads its own row. The true range is returned as well so callers can
+    reuse it for any other ATR check instead of recomputing it.
+    """
+    tr = true_range(highs, lows, closes)
+    window_atr = window_atr14(highs, lows, closes, tr)
+
+    return {
+        "true_range": tr,
+        "atr14": rolling(tr, 14, np.mean),
+        # Mean of the 50 most recent window ATRs ending at window start j
+        "atr50": rolling(window_atr, 50, np.mean),
+        "range_high": rolling(closes, 30, np.max),
+        "range_low": rolling(closes, 30, np.min),
+        "vol50": rolling(volumes, 50, np.mean),
+    }
+
+
+def scanner_indicators(closes: np.ndarray, tr: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-bar RSI/ATR/z-score series matching breakout_scanner's calculate_* helpers
+
+    Entry i equals the scanner function applied to the history up to bar i;
+    histories shorter than 21 bars are left as NaN. `tr` is the true-range
+    series of the same bars.
+    """
+    n = len(closes)
+    rsi = np.full(n, np.nan)
+    atr = np.full(n, np.nan)
+    z_score = np.full(n, np.nan)
+    if n < 21:
+        return {"rsi": rsi, "atr": atr, "z_score": z_score}
+
+    # The scanner averages only the first 14 changes, so its RSI is fixed once
+    # the history is long enough
+    deltas = np.diff(closes[:15])
+    avg_gain = np.mean(np.where(deltas > 0, deltas, 0))
+    avg_loss = np.mean(np.where(deltas < 0, -deltas, 0))
+    rsi[20:] = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+
+    atr[20:] = rolling(tr, 14, np.mean)[20:]
+
+    # Z-score of the latest % change against the 20 changes ending at that bar
+    changes = np.diff(closes) / closes[:-1] * 100
+    windows = sliding_window_view(changes, 20)
+    mean_change = windows.mean(axis=-1)
+    std_change = windows.std(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_score[20:] = np.where(std_change == 0, 0.0, (windows[:, -1] - mean_change) / std_change)
+
+    return {"rsi": rsi, "atr": atr, "z_score": z_score}
+
+
+def sliding_extreme(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    """Max or min (ufunc=np.maximum / np.minimum) of every length-`window` run of values
+
+    out[k] covers values[k:k + window]. Uses van Herk/Gil-Werman block prefix and
+    suffix scans, so the cost is O(n) regardless of the window length.
+    """
+    n = len(values)
+    if n < window:
+        return np.empty(0)
+    fill = -np.inf if ufunc is np.maximum else np.inf
+    n_blocks = -(-n // window)
+    blocks = np.full(n_blocks * window, fill)
+    blocks[:n] = values
+    blocks = blocks.reshape(n_blocks, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+def impulse_moves(highs: np.ndarray, lows: np.ndarray, half_window: int) -> np.ndarray:
+    """High-to-low move (%) of each impulse window
+
+    moves[k] covers bars [k, k + 2*half_window), i.e. the window centred on bar
+    k + half_window of the classic `for i in range(w, n - w)` scan. Flat windows
+    score 0.
+    """
+    width = 2 * half_window
+    if len(highs) <= width:
+        return np.empty(0)
+    window_highs = sliding_extreme(highs[:-1], width, np.maximum)
+    window_lows = sliding_extreme(lows[:-1], width, np.minimum)
+    return np.where(window_highs > window_lows,
+                    (window_highs - window_lows) / window_lows * 100, 0.0)
+
+
+def prior_impulse(highs: np.ndarray, lows: np.ndarray, half_window: int, threshold: float = 30.0):
+    """Scan centred windows for a prior impulse move
+
+    Returns (best_move_pct, detected). Like the original loop, the scan stops at
+    the first window whose move reaches the threshold.
+    """
+    moves = impulse_moves(highs, lows, half_window)
+    if not moves.size:
+        return 0, False
+    hits = np.flatnonzero(moves >= threshold)
+    if hits.size:
+        return moves[:hits[0] + 1].max(), True
+    return moves.max(), False
+
+
+@contextlib.contextmanager
+def buffered_stdout() -> Iterator[None]:
+    """Collect everything printed inside the block and write it to stdout once"""
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            yield
+    finally:
+        sys.stdout.write(buf.getvalue())
+
+
+def write_json(path: Path, obj) -> None:
+    """Write obj as indented JSON, through orjson when it is installed
+
+    Values JSON cannot represent are written as str(); orjson additionally
+    maps NumPy values to plain JSON numbers and lists.
+    """
+    try:
+        import orjson
+    except ImportError:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2, default=str)
+        return
+    Path(path).write_bytes(orjson.dumps(
+        obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Cached Alpaca bar loading shared by the analysis scripts.
+
+Callers are expected to have put the Alpaca SDK on sys.path and loaded the API
+keys (see the import preamble of the scripts) before importing this module.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.models import Bar
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+
+# On-disk cache for fetched bars (historical bars for a closed range never change)
+CACHE_DIR = Path(__file__).parent / ".cache"
+
+
+@functools.lru_cache(maxsize=None)
+def get_client() -> StockHistoricalDataClient:
+    """Return the process-wide historical data client"""
+    return StockHistoricalDataClient(os.getenv('ALPACA_API_KEY'), os.getenv('ALPACA_SECRET_KEY'))
+
+
+def _cache_path(symbol: str, start: datetime, end: datetime, timeframe: TimeFrame) -> Path:
+    return CACHE_DIR / f"{symbol.lower()}_{timeframe.value}_{start:%Y%m%d}_{end:%Y%m%d}.pkl"
+
+
+# Errors from a truncated file or from bars pickled by an incompatible SDK version
+_UNREADABLE_CACHE = (pickle.UnpicklingError, EOFError, AttributeError, ImportError)
+
+
+def _read_cache(cache_path: Path) -> Optional[List[Bar]]:
+    """Cached bars, or None on a miss; unreadable files are dropped so they get refetched"""
+    try:
+        return pickle.loads(cache_path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except _UNREADABLE_CACHE:
+        cache_path.unlink(missing_ok=True)
+        return None
+
+
+def _write_cache(cache_path: Path, bars: List[Bar]) -> None:
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Write beside the target and rename it into place, so an interrupted
+    # write never leaves a partial file under the final name
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pickle.dumps(bars))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def load_bars(symbol: str, start: datetime, end: datetime,
+              timeframe: TimeFrame = TimeFrame.Day) -> List[Bar]:
+    """Fetch bars for one symbol, memoized in-process and under .cache/
+
+    Returns an empty list when Alpaca has no data for the symbol; empty
+    results are not written to disk.
+    """
+    cache_path = _cache_path(symbol, start, end, timeframe)
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        return cached
+
+    request = StockBarsRequest(
+        symbol_or_symbols=symbol,
+        timeframe=timeframe,
+        start=start,
+        end=end
+    )
+    response = get_client().get_stock_bars(request)
+    bars = response.data.get(symbol, []) if response else []
+
+    if bars:
+        _write_cache(cache_path, bars)
+    return bars
+
+
+def load_bars_batch(symbols: Sequence[str], start: datetime, end: datetime,
+                    timeframe: TimeFrame = TimeFrame.Day) -> Dict[str, List[Bar]]:
+    """Fetch bars for symbols sharing one window, reading .cache/ first
+
+    Symbols missing from the cache are fetched together in a single request;
+    symbols Alpaca has no data for map to an empty list.
+    """
+    bars: Dict[str, List[Bar]] = {}
+    missing = []
+    for symbol in symbols:
+        cached = _read_cache(_cache_path(symbol, start, end, timeframe))
+        if cached is not None:
+            bars[symbol] = cached
+        else:
+            missing.append(symbol)
+
+    if missing:
+        request = StockBarsRequest(
+            symbol_or_symbols=missing,
+            timeframe=timeframe,
+            start=start,
+            end=end
+        )
+        response = get_client().get_stock_bars(request)
+        data = response.data if response else {}
+        for symbol in missing:
+            bars[symbol] = data.get(symbol, [])
+            if bars[symbol]:
+                _write_cache(_cache_path(symbol, start, end, timeframe), bars[symbol])
+
+    return {symbol: bars[symbol] for symbol in symbols}
+
+
+def load_bars_many(symbols: Sequence[str], start: datetime, end: datetime,
+                   timeframe: TimeFrame = TimeFrame.Day) -> Dict[str, List[Bar]]:
+    """Fetch several symbols concurrently; the requests are network-bound"""
+    if not symbols:
+        return {}
+    get_client()  # build the shared client before the worker threads need it
+    with ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+        futures = {symbol: pool.submit(load_bars, symbol, start, end, timeframe)
+                   for symbol in symbols}
+    return {symbol: future.result() for symbol, future in futures.items()}
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Environment setup shared by the analysis scripts: API keys and the Alpaca SDK path.
+
+ensure_ready() is idempotent, so scripts imported into one session (a notebook
+or an orchestrator) read the .env file and extend sys.path only once.
+"""
+
+import sys
+from pathlib import Path
+
+ENV_FILE = Path(__file__).parent / "config" / "api_keys.env"
+ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
+
+_READY = False
+
+
+def ensure_ready() -> None:
+    """Load config/api_keys.env and put the Alpaca SDK on sys.path, once per process"""
+    global _READY
+    if _READY:
+        return
+    _READY = True
+
+    try:
+        from dotenv import load_dotenv
+        if ENV_FILE.exists():
+            load_dotenv(ENV_FILE)
+            print("🔑 Loaded API keys from .env file")
+    except ImportError:
+        pass
+
+    if str(ALPACA_DIR) not in sys.path:
+        sys.path.insert(0, str(ALPACA_DIR))
@@ -786,8 +786,9 @@ class UnifiedAnalyst:
 
         # --- 3. ATR contraction (14d vs 50d)
         def atr(h, l, c, n=14):
-            prev = np.roll(c, 1)
+            prev = np.empty_like(c)
             prev[0] = c[0]
+            prev[1:] = c[:-1]
             tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
             return np.mean(tr[-n:])
         
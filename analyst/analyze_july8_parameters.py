@@ -121,8 +121,9 @@ def analyze_july8_parameter_issues(bars: List[Bar]):
     # 3. ATR Contraction Analysis
     print("\n3. 📊 ATR CONTRACTION:")
     def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
+        prev = np.empty_like(c)
         prev[0] = c[0]
+        prev[1:] = c[:-1]
         tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
         return np.mean(tr[-n:])
     
@@ -173,20 +173,14 @@ def detect_flag_breakout_setup(bars: List[Bar], symbol: str) -> Optional[SetupTa
     recent_lows = lows[-20:]
     
     # Check for higher lows
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
-    
-    # Check for ATR contraction
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
+    
+    # Check for ATR contraction (true range of each flag bar after the first)
+    h = np.array(recent_highs)
+    l = np.array(recent_lows)
+    c = np.array(recent_closes)
+    prev = np.concatenate(([c[0]], c[:-1]))
+    atr_values = np.maximum.reduce([h - l, np.abs(h - prev), np.abs(l - prev)])[1:]
     
     if len(atr_values) < 10:
         return None
@@ -234,8 +228,9 @@ def _sma(arr: np.ndarray, n: int) -> np.ndarray:
 
 def _atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int) -> np.ndarray:
     """Average True Range calculation"""
-    prev_close = np.roll(close, 1)
+    prev_close = np.empty_like(close)
     prev_close[0] = close[0]
+    prev_close[1:] = close[:-1]
     tr = np.maximum.reduce([
         high - low,
         np.abs(high - prev_close),
@@ -662,8 +657,9 @@ def _old_checklist_removed(symbol: str, bars: list, benchmark_bars: list) -> str
 
     # --- 4. ATR contraction (14d vs 50d)
     def atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
+        prev = np.empty_like(c)
         prev[0] = c[0]
+        prev[1:] = c[:-1]
         tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
         return np.mean(tr[-n:])
     atr5 = atr(highs, lows, closes, 5)
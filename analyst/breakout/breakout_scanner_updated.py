@@ -10,6 +10,7 @@ import os
 import sys
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
@@ -55,14 +56,23 @@ def _sma(arr: np.ndarray, n: int) -> np.ndarray:
     if len(arr) < n:
         return np.full_like(arr, fill_value=np.nan, dtype=float)
     w = np.ones(n) / n
-    out = np.convolve(arr, w, mode='full')[:len(arr)]
-    out[:n-1] = np.nan
+    # Only the fully-overlapping windows are kept, so skip the ramp-up outputs
+    out = np.full(len(arr), np.nan)
+    out[n-1:] = np.convolve(arr, w, mode='valid')
+    return out
+
+def _rolling(arr: np.ndarray, n: int, reducer) -> np.ndarray:
+    """Trailing n-bar reduction (e.g. np.max), NaN until the first full window"""
+    out = np.full(len(arr), np.nan)
+    if len(arr) >= n:
+        out[n-1:] = reducer(sliding_window_view(arr, n), axis=-1)
     return out
 
 def _atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int) -> np.ndarray:
     """Average True Range calculation"""
-    prev_close = np.roll(close, 1)
+    prev_close = np.empty_like(close)
     prev_close[0] = close[0]
+    prev_close[1:] = close[:-1]
     tr = np.maximum.reduce([
         high - low,
         np.abs(high - prev_close),
@@ -86,6 +96,42 @@ def _higher_lows_pivots(lows: np.ndarray, left: int = 3, right: int = 3, needed:
     last = [p[1] for p in pivots[-needed:]]
     return last[0] < last[1] < last[2]
 
+def _bar_arrays(bars: List[Bar]) -> Tuple[np.ndarray, ...]:
+    """High/low/close/volume arrays for a list of bars"""
+    highs  = np.array([float(b.high)  for b in bars], dtype=float)
+    lows   = np.array([float(b.low)   for b in bars], dtype=float)
+    closes = np.array([float(b.close) for b in bars], dtype=float)
+    vols   = np.array([float(b.volume) for b in bars], dtype=float)
+    return highs, lows, closes, vols
+
+def breakout_series(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+    vols: np.ndarray,
+    atr_len: int = 14,
+    atr_ma: int = 50,
+    vol_ma: int = 50,
+    base_len: int = 20
+) -> Dict[str, np.ndarray]:
+    """Price/volume arrays plus the base-range, ATR, ATR MA and volume MA series the
+    detectors use. Every series is causal, so slicing each one to [:end] gives what
+    the detectors would compute from bars[:end]; callers scanning many end dates can
+    build this once and pass the slices in via `series` (same lengths as the detector).
+    """
+    atr_series = _atr(highs, lows, closes, atr_len)
+    return {
+        "closes": closes,
+        "highs": highs,
+        "lows": lows,
+        "vols": vols,
+        "base_high": _rolling(closes, base_len, np.max),
+        "base_low": _rolling(closes, base_len, np.min),
+        "atr": atr_series,
+        "atr_ma": _sma(atr_series, atr_ma),
+        "vol_ma": _sma(vols, vol_ma),
+    }
+
 def detect_flag_breakout_setup(
     bars: List[Bar], 
     symbol: str, 
@@ -99,7 +145,8 @@ def detect_flag_breakout_setup(
     min_break_above_pct: float = 1.0,  # Keep relaxed threshold
     vol_ma: int = 50,
     vol_mult: float = 1.5,
-    use_market_filter: bool = True  # UPDATED: Add market filter to Flag
+    use_market_filter: bool = True,  # UPDATED: Add market filter to Flag
+    series: Optional[Dict[str, np.ndarray]] = None
 ) -> Optional[SetupTag]:
     """
     Updated Flag Breakout detector with unified parameters.
@@ -109,10 +156,12 @@ def detect_flag_breakout_setup(
     if len(bars) < min_needed:
         return None
 
-    closes = np.array([float(b.close) for b in bars], dtype=float)
-    highs  = np.array([float(b.high)  for b in bars], dtype=float)
-    lows   = np.array([float(b.low)   for b in bars], dtype=float)
-    vols   = np.array([float(b.volume) for b in bars], dtype=float)
+    if series is None:
+        series = breakout_series(*_bar_arrays(bars), atr_len, atr_ma, vol_ma, base_len)
+    closes = series["closes"]
+    highs  = series["highs"]
+    lows   = series["lows"]
+    vols   = series["vols"]
 
     # Look for prior impulse (30%+ move in last 60 days)
     impulse_detected = False
@@ -133,10 +182,8 @@ def detect_flag_breakout_setup(
         return None
 
     # --- Tight Base Analysis (20-day) ---
-    base_slice = slice(-base_len, None)
-    base_closes = closes[base_slice]
-    range_high = float(np.max(base_closes))
-    range_low  = float(np.min(base_closes))
+    range_high = float(series["base_high"][-1])
+    range_low  = float(series["base_low"][-1])
     range_size = range_high - range_low
     if range_low <= 0 or range_size <= 0:
         return None
@@ -144,8 +191,8 @@ def detect_flag_breakout_setup(
     tight_base = range_pct <= (max_range_width_pct / 100.0)
 
     # --- ATR contraction ---
-    atr_series = _atr(highs, lows, closes, atr_len)
-    atr_ma_series = _sma(atr_series, atr_ma)
+    atr_series = series["atr"]
+    atr_ma_series = series["atr_ma"]
     atr_ratio = float(atr_series[-1] / atr_ma_series[-1]) if (not np.isnan(atr_series[-1]) and not np.isnan(atr_ma_series[-1]) and atr_ma_series[-1] != 0) else np.nan
     contraction_ok = (not np.isnan(atr_ratio)) and (atr_ratio <= atr_ratio_thresh)
 
@@ -158,7 +205,7 @@ def detect_flag_breakout_setup(
     min_break_price = range_high * (1.0 + min_break_above_pct / 100.0)
     price_break = closes[-1] >= min_break_price
 
-    vol_ma_series = _sma(vols, vol_ma)
+    vol_ma_series = series["vol_ma"]
     vol_spike = (not np.isnan(vol_ma_series[-1])) and (vol_ma_series[-1] > 0) and (vols[-1] >= vol_mult * vol_ma_series[-1])
 
     breakout_ok = price_break and vol_spike
@@ -256,7 +303,8 @@ def detect_range_breakout_setup(
     min_break_above_pct: float = 1.5,
     vol_ma: int = 50,
     vol_mult: float = 1.5,
-    use_market_filter: bool = True
+    use_market_filter: bool = True,
+    series: Optional[Dict[str, np.ndarray]] = None
 ) -> Optional[SetupTag]:
     """
     Updated Range Breakout detector with unified parameters.
@@ -266,16 +314,16 @@ def detect_range_breakout_setup(
     if len(bars) < min_needed:
         return None
 
-    closes = np.array([float(b.close) for b in bars], dtype=float)
-    highs  = np.array([float(b.high)  for b in bars], dtype=float)
-    lows   = np.array([float(b.low)   for b in bars], dtype=float)
-    vols   = np.array([float(b.volume) for b in bars], dtype=float)
+    if series is None:
+        series = breakout_series(*_bar_arrays(bars), atr_len, atr_ma, vol_ma, base_len)
+    closes = series["closes"]
+    highs  = series["highs"]
+    lows   = series["lows"]
+    vols   = series["vols"]
 
     # --- Base (range) using last base_len bars (close-based) ---
-    base_slice = slice(-base_len, None)
-    base_closes = closes[base_slice]
-    range_high = float(np.max(base_closes))
-    range_low  = float(np.min(base_closes))
+    range_high = float(series["base_high"][-1])
+    range_low  = float(series["base_low"][-1])
     range_size = range_high - range_low
     if range_low <= 0 or range_size <= 0:
         return None
@@ -283,8 +331,8 @@ def detect_range_breakout_setup(
     tight_base = range_pct <= (max_range_width_pct / 100.0)
 
     # --- ATR contraction (full series; evaluate last bar) ---
-    atr_series = _atr(highs, lows, closes, atr_len)
-    atr_ma_series = _sma(atr_series, atr_ma)
+    atr_series = series["atr"]
+    atr_ma_series = series["atr_ma"]
     atr_ratio = float(atr_series[-1] / atr_ma_series[-1]) if (not np.isnan(atr_series[-1]) and not np.isnan(atr_ma_series[-1]) and atr_ma_series[-1] != 0) else np.nan
     contraction_ok = (not np.isnan(atr_ratio)) and (atr_ratio <= atr_ratio_thresh)
 
@@ -297,7 +345,7 @@ def detect_range_breakout_setup(
     min_break_price = range_high * (1.0 + min_break_above_pct / 100.0)
     price_break = closes[-1] >= min_break_price
 
-    vol_ma_series = _sma(vols, vol_ma)
+    vol_ma_series = series["vol_ma"]
     vol_spike = (not np.isnan(vol_ma_series[-1])) and (vol_ma_series[-1] > 0) and (vols[-1] >= vol_mult * vol_ma_series[-1])
 
     breakout_ok = price_break and vol_spike
@@ -499,8 +499,9 @@ def _sma(arr: np.ndarray, n: int) -> np.ndarray:
 
 def _atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int) -> np.ndarray:
     """Average True Range calculation"""
-    prev_close = np.roll(close, 1)
+    prev_close = np.empty_like(close)
     prev_close[0] = close[0]
+    prev_close[1:] = close[:-1]
     tr = np.maximum.reduce([
         high - low,
         np.abs(high - prev_close),
@@ -815,8 +816,9 @@ def breakout_checklist(symbol: str, bars: list, benchmark_bars: list) -> str:
 
     # --- 4. ATR contraction (14d vs 50d)
     def atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
+        prev = np.empty_like(c)
         prev[0] = c[0]
+        prev[1:] = c[:-1]
         tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
         return np.mean(tr[-n:])
     atr14 = atr(highs, lows, closes, 14)
@@ -3,14 +3,13 @@
 Detailed PRTS Analysis - May-July 2020
 Look for significant price movements and patterns
 """
-import os
 import sys
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict
-import json
 
 # Load environment variables
 try:
@@ -26,84 +25,73 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import bars_to_soa, buffered_stdout, write_json
+from _data import load_bars
+
 def analyze_price_action(bars: List[Bar]) -> Dict:
     """Analyze PRTS price action for significant moves and patterns"""
     if len(bars) < 10:
         return {"error": "Insufficient data"}
     
-    closes = [float(bar.close) for bar in bars]
-    highs = [float(bar.high) for bar in bars]
-    lows = [float(bar.low) for bar in bars]
-    volumes = [float(bar.volume) for bar in bars]
-    dates = [bar.timestamp.date() for bar in bars]
+    day_dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    dates = day_dates.tolist()
     
     # Calculate daily returns
-    returns = []
-    for i in range(1, len(closes)):
-        daily_return = (closes[i] - closes[i-1]) / closes[i-1] * 100
-        returns.append(daily_return)
+    returns = np.diff(closes) / closes[:-1] * 100
     
     # Find significant moves (>5% daily moves)
-    significant_moves = []
-    for i, ret in enumerate(returns):
-        if abs(ret) >= 5.0:  # 5% or more move
-            significant_moves.append({
-                "date": dates[i+1],
-                "return_pct": ret,
-                "price": closes[i+1],
-                "volume": volumes[i+1]
-            })
+    significant_moves = [
+        {
+            "date": dates[i+1],
+            "return_pct": returns[i],
+            "price": closes[i+1],
+            "volume": volumes[i+1]
+        }
+        for i in np.flatnonzero(np.abs(returns) >= 5.0)  # 5% or more move
+    ]
     
     # Calculate key statistics
     total_return = (closes[-1] - closes[0]) / closes[0] * 100
     max_price = max(closes)
     min_price = min(closes)
-    max_drawdown = 0
-    peak = closes[0]
-    
-    for price in closes:
-        if price > peak:
-            peak = price
-        drawdown = (peak - price) / peak * 100
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
+    running_peak = np.maximum.accumulate(closes)
+    max_drawdown = float(((running_peak - closes) / running_peak * 100).max())
     
     # Find highest volume days
     avg_volume = np.mean(volumes)
-    high_volume_days = []
-    for i, vol in enumerate(volumes):
-        if vol > avg_volume * 2:  # 2x average volume
-            high_volume_days.append({
-                "date": dates[i],
-                "volume": vol,
-                "volume_multiple": vol / avg_volume,
-                "price": closes[i],
-                "return_pct": returns[i-1] if i > 0 else 0
-            })
-    
-    # Look for consolidation periods (low volatility)
-    volatility_periods = []
+    high_volume_days = [
+        {
+            "date": dates[i],
+            "volume": volumes[i],
+            "volume_multiple": volumes[i] / avg_volume,
+            "price": closes[i],
+            "return_pct": returns[i-1] if i > 0 else 0
+        }
+        for i in np.flatnonzero(volumes > avg_volume * 2)  # 2x average volume
+    ]
+    
+    # Look for consolidation periods (low volatility): window k covers the
+    # returns and closes of days k..k+window_size-1 and ends on day k+window_size
     window_size = 10
-    
-    for i in range(window_size, len(closes)):
-        window_returns = returns[i-window_size:i]
-        volatility = np.std(window_returns)
-        
-        if volatility < 2.0:  # Low volatility threshold
-            volatility_periods.append({
-                "start_date": dates[i-window_size],
-                "end_date": dates[i],
-                "volatility": volatility,
-                "price_range": (max(closes[i-window_size:i]) - min(closes[i-window_size:i])) / min(closes[i-window_size:i]) * 100
-            })
+    volatility = sliding_window_view(returns, window_size).std(axis=-1)
+    window_closes = sliding_window_view(closes[:-1], window_size)
+    window_high = window_closes.max(axis=-1)
+    window_low = window_closes.min(axis=-1)
+    
+    volatility_periods = [
+        {
+            "start_date": dates[k],
+            "end_date": dates[k + window_size],
+            "volatility": volatility[k],
+            "price_range": (window_high[k] - window_low[k]) / window_low[k] * 100
+        }
+        for k in np.flatnonzero(volatility < 2.0)  # Low volatility threshold
+    ]
     
     return {
         "symbol": "PRTS",
@@ -192,37 +180,24 @@ def main():
     
     try:
         # Fetch PRTS data
-        api_key = os.getenv('ALPACA_API_KEY')
-        secret_key = os.getenv('ALPACA_SECRET_KEY')
-        
-        client = StockHistoricalDataClient(api_key, secret_key)
-        
-        request = StockBarsRequest(
-            symbol_or_symbols="PRTS",
-            timeframe=TimeFrame.Day,
-            start=start_date,
-            end=end_date
-        )
-        
-        bars = client.get_stock_bars(request)
+        prts_bars = load_bars("PRTS", start_date, end_date)
         
-        if not bars or "PRTS" not in bars.data:
+        if not prts_bars:
             print("❌ No PRTS data found")
             return
         
-        prts_bars = bars.data["PRTS"]
         print(f"📊 Fetched {len(prts_bars)} PRTS bars")
         
         # Analyze price action
         results = analyze_price_action(prts_bars)
         
         # Print analysis
-        print_detailed_analysis(results)
+        with buffered_stdout():
+            print_detailed_analysis(results)
         
         # Save results
         output_file = Path(__file__).parent / "prts_detailed_analysis_2020.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        write_json(output_file, results)
         
         print(f"\n💾 Detailed analysis saved to: {output_file}")
         
@@ -3,7 +3,6 @@
 PRTS July 2020 - ALL Trading Days Analysis
 Complete breakdown of every single day in July 2020
 """
-import os
 import sys
 import numpy as np
 from datetime import datetime
@@ -24,57 +23,48 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import bars_to_soa, buffered_stdout, precompute_indicators, prior_impulse
+from _data import load_bars
+
 def get_july_data():
     """Get all PRTS data for July 2020"""
-    api_key = os.getenv('ALPACA_API_KEY')
-    secret_key = os.getenv('ALPACA_SECRET_KEY')
-    
-    client = StockHistoricalDataClient(api_key, secret_key)
-    
-    # Get extended data for analysis
-    request = StockBarsRequest(
-        symbol_or_symbols="PRTS",
-        timeframe=TimeFrame.Day,
-        start=datetime(2020, 5, 1),
-        end=datetime(2020, 7, 31)
-    )
-    
-    bars = client.get_stock_bars(request)
-    return bars.data["PRTS"]
+    return load_bars("PRTS", datetime(2020, 5, 1), datetime(2020, 7, 31))
 
 def analyze_all_july_days(bars: List[Bar]):
     """Analyze ALL July days for breakout criteria"""
     
-    # Get July bars
-    july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
+    # Build the full-history arrays and rolling indicators once; each July day
+    # only indexes into them instead of re-filtering and re-computing a prefix
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    indicators = precompute_indicators(highs, lows, closes, volumes)
+    
+    # Positions of the July 2020 bars (bars arrive sorted by date)
+    july_idx = np.flatnonzero(dates.astype('datetime64[M]') == np.datetime64('2020-07'))
     
     print("📊 PRTS JULY 2020 - ALL TRADING DAYS BREAKOUT ANALYSIS")
     print("=" * 80)
-    print(f"📅 Total July Trading Days: {len(july_bars)}")
+    print(f"📅 Total July Trading Days: {len(july_idx)}")
     print("=" * 80)
     
-    for i, bar in enumerate(july_bars):
-        date = bar.timestamp.date()
-        price = float(bar.close)
-        volume = float(bar.volume)
+    for i, idx in enumerate(july_idx):
+        date = dates[idx]
+        price = closes[idx]
+        volume = volumes[idx]
         
-        # Get historical data up to this point
-        historical_bars = [b for b in bars if b.timestamp.date() <= date]
+        # Number of bars up to and including this day
+        end = idx + 1
         
-        if len(historical_bars) < 60:
+        if end < 60:
             continue
         
         # Calculate daily change
         if i > 0:
-            prev_price = float(july_bars[i-1].close)
+            prev_price = closes[july_idx[i-1]]
             daily_change = (price - prev_price) / prev_price * 100
         else:
             daily_change = 0.0
@@ -83,61 +73,40 @@ def analyze_all_july_days(bars: List[Bar]):
         print("-" * 70)
         
         # Analyze breakout criteria
-        analyze_breakout_criteria(historical_bars, price, volume)
+        analyze_breakout_criteria(highs[:end], lows[:end], closes[:end], volumes[:end],
+                                  indicators, price, volume)
 
-def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_volume: float):
-    """Analyze breakout criteria for a specific day"""
+def analyze_breakout_criteria(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                              volumes: np.ndarray, indicators: Dict[str, np.ndarray],
+                              current_price: float, current_volume: float):
+    """Analyze breakout criteria for a specific day
     
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
+    The arrays are the history up to and including the day; `indicators` holds
+    the full-history rolling series from precompute_indicators.
+    """
+    end_idx = len(closes) - 1
     
     # FLAG BREAKOUT ANALYSIS
     print("🚩 FLAG BREAKOUT:")
     
     # 1. Prior Impulse (30%+ move)
-    impulse_detected = False
-    best_impulse = 0
-    for i in range(20, len(bars) - 20):
-        window_high = np.max(highs[i-20:i+20])
-        window_low = np.min(lows[i-20:i+20])
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low * 100
-            if move_pct > best_impulse:
-                best_impulse = move_pct
-            if move_pct >= 30:
-                impulse_detected = True
-                break
+    best_impulse, impulse_detected = prior_impulse(highs, lows, 20)
     
     impulse_status = "✅" if impulse_detected else "❌"
     print(f"  {impulse_status} Prior Impulse: {best_impulse:.1f}% (Required: ≥30%)")
     
     # 2. Higher Lows (last 20 days)
     recent_lows = lows[-20:]
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
     
     higher_lows_pct = (higher_lows / len(recent_lows)) * 100
     higher_lows_ok = higher_lows >= 10  # At least half should be higher lows
     higher_lows_status = "✅" if higher_lows_ok else "❌"
     print(f"  {higher_lows_status} Higher Lows: {higher_lows}/{len(recent_lows)} ({higher_lows_pct:.1f}%)")
     
-    # 3. ATR Contraction
-    recent_closes = closes[-20:]
+    # 3. ATR Contraction (true ranges of the last 20 bars, from the 2nd bar on)
     recent_highs = highs[-20:]
-    recent_lows = lows[-20:]
-    
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    atr_values = indicators["true_range"][max(end_idx - 18, 1):end_idx + 1]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
@@ -163,31 +132,24 @@ def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_vol
     print("\n📦 RANGE BREAKOUT:")
     
     # 1. Tight Base (≤15% range)
-    base_closes = closes[-30:]
-    range_high = np.max(base_closes)
-    range_low = np.min(base_closes)
+    range_high = indicators["range_high"][end_idx]
+    range_low = indicators["range_low"][end_idx]
     range_pct = (range_high - range_low) / range_low * 100
     tight_base_ok = range_pct <= 15.0
     tight_base_status = "✅" if tight_base_ok else "❌"
     print(f"  {tight_base_status} Tight Base: {range_pct:.1f}% (Required: ≤15%)")
     
     # 2. ATR Contraction (14d vs 50d)
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = indicators["atr14"][end_idx]
+    # The last complete window ATR covers bars [end_idx-14, end_idx)
+    atr50 = indicators["atr50"][end_idx - 14] if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     range_atr_ok = atr_ratio <= 0.8
     range_atr_status = "✅" if range_atr_ok else "❌"
     print(f"  {range_atr_status} ATR Contraction: {atr_ratio:.3f} (Required: ≤0.8)")
     
     # 3. Volume Expansion (≥1.5x)
-    vol50 = np.mean(volumes[-51:-1]) if len(volumes) > 50 else np.mean(volumes)
+    vol50 = indicators["vol50"][end_idx - 1] if len(volumes) > 50 else np.mean(volumes)
     vol_mult = current_volume / vol50 if vol50 > 0 else 1
     vol_spike_ok = vol_mult >= 1.5
     vol_status = "✅" if vol_spike_ok else "❌"
@@ -222,7 +184,8 @@ def main():
         print(f"📊 Fetched {len(bars)} total bars")
         
         # Analyze all July days
-        analyze_all_july_days(bars)
+        with buffered_stdout():
+            analyze_all_july_days(bars)
         
         print("\n" + "=" * 80)
         print("📋 JULY 2020 SUMMARY:")
@@ -3,14 +3,12 @@
 PRTS July 2020 Complete Analysis - All Trading Days
 Show every single day with detailed breakout criteria analysis
 """
-import os
 import sys
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
-import json
 
 # Load environment variables
 try:
@@ -26,58 +24,50 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
-# Import breakout analysis functions
-sys.path.insert(0, str(Path(__file__).parent))
-from breakout.breakout_scanner import (
-    detect_flag_breakout_setup, 
-    detect_range_breakout_setup,
-    calculate_rsi,
-    calculate_atr,
-    calculate_z_score
-)
+from _breakout_kernels import (bars_to_soa, buffered_stdout, precompute_indicators, prior_impulse,
+                               scanner_indicators, write_json)
+from _data import load_bars
 
 def analyze_complete_july(bars: List[Bar]) -> Dict:
     """Complete July analysis with all trading days"""
     
-    # Filter for July 2020 bars
-    july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
+    dates, all_highs, all_lows, all_closes, all_volumes = bars_to_soa(bars)
+    
+    # Positions of the July 2020 bars (bars arrive sorted by date)
+    july_idx = np.flatnonzero(dates.astype('datetime64[M]') == np.datetime64('2020-07'))
+    
+    # Rolling indicators over the full history; each day reads its own row
+    indicators = precompute_indicators(all_highs, all_lows, all_closes, all_volumes)
+    scanner = scanner_indicators(all_closes, indicators["true_range"])
     
     results = {
         "symbol": "PRTS",
         "month": "July 2020",
-        "total_days": len(july_bars),
+        "total_days": len(july_idx),
         "daily_analysis": []
     }
     
-    print(f"📊 Found {len(july_bars)} July trading days")
+    print(f"📊 Found {len(july_idx)} July trading days")
     
-    # Analyze each July day
-    for i, current_bar in enumerate(july_bars):
-        current_date = current_bar.timestamp.date()
-        
-        # Get all bars up to this point (need history for analysis)
-        historical_bars = [bar for bar in bars if bar.timestamp.date() <= current_date]
-        
-        if len(historical_bars) < 60:  # Need at least 60 days of history
-            continue
+    # Analyze each July day with at least 60 bars of history (up to and including it)
+    for idx in july_idx[july_idx >= 59]:
+        current_date = dates[idx].item()
+        end = idx + 1
         
         # Calculate technical indicators
-        closes = [float(bar.close) for bar in historical_bars]
-        highs = [float(bar.high) for bar in historical_bars]
-        lows = [float(bar.low) for bar in historical_bars]
-        volumes = [float(bar.volume) for bar in historical_bars]
+        closes = all_closes[:end]
+        highs = all_highs[:end]
+        lows = all_lows[:end]
+        volumes = all_volumes[:end]
         
-        rsi = calculate_rsi(closes)
-        atr = calculate_atr(highs, lows, closes)
-        z_score = calculate_z_score(closes)
+        rsi = scanner["rsi"][idx]
+        atr = scanner["atr"][idx]
+        z_score = scanner["z_score"][idx]
         
         # Calculate daily change
         if len(closes) >= 2:
@@ -85,71 +75,27 @@ def analyze_complete_july(bars: List[Bar]) -> Dict:
         else:
             daily_change = 0.0
         
-        # Check flag breakout setup
-        flag_breakout = detect_flag_breakout_setup(historical_bars, "PRTS")
-        
-        # Check range breakout setup
-        range_breakout = detect_range_breakout_setup(historical_bars, "PRTS")
-        
-        # Detailed analysis of criteria
-        analysis = analyze_breakout_criteria(historical_bars, current_date, closes[-1], daily_change, volumes[-1])
+        price = float(closes[-1])
         
-        results["daily_analysis"].append(analysis)
+        # Detailed analysis of flag and range breakout criteria
+        results["daily_analysis"].append({
+            "date": current_date,
+            "price": price,
+            "daily_change_pct": daily_change,
+            "volume": float(volumes[-1]),
+            "rsi": rsi,
+            "atr": atr,
+            "z_score": z_score,
+            "flag_breakout": analyze_flag_detailed(closes, highs, lows, indicators),
+            "range_breakout": analyze_range_detailed(closes, highs, lows, volumes, indicators, price)
+        })
     
     return results
 
-def analyze_breakout_criteria(bars: List[Bar], date, price: float, daily_change: float, volume: float) -> Dict:
-    """Analyze all breakout criteria in detail"""
-    if len(bars) < 60:
-        return {"error": "Insufficient data"}
-    
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
-    
-    # Calculate technical indicators
-    rsi = calculate_rsi(closes.tolist())
-    atr = calculate_atr(highs.tolist(), lows.tolist(), closes.tolist())
-    z_score = calculate_z_score(closes.tolist())
-    
-    # FLAG BREAKOUT ANALYSIS
-    flag_analysis = analyze_flag_detailed(closes, highs, lows)
-    
-    # RANGE BREAKOUT ANALYSIS
-    range_analysis = analyze_range_detailed(closes, highs, lows, volumes, price)
-    
-    return {
-        "date": date,
-        "price": price,
-        "daily_change_pct": daily_change,
-        "volume": volume,
-        "rsi": rsi,
-        "atr": atr,
-        "z_score": z_score,
-        "flag_breakout": flag_analysis,
-        "range_breakout": range_analysis
-    }
-
-def analyze_flag_detailed(closes, highs, lows):
+def analyze_flag_detailed(closes, highs, lows, indicators):
     """Detailed flag breakout analysis"""
     # Check for prior impulse (30%+ move in last 60 days)
-    impulse_detected = False
-    impulse_pct = 0
-    best_impulse = 0
-    
-    for i in range(20, len(closes) - 20):
-        window_high = np.max(highs[i-20:i+20])
-        window_low = np.min(lows[i-20:i+20])
-        
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low
-            if move_pct > best_impulse:
-                best_impulse = move_pct
-            if move_pct >= 0.30:  # 30%+ move
-                impulse_detected = True
-                impulse_pct = move_pct * 100
-                break
+    best_impulse_pct, impulse_detected = prior_impulse(highs, lows, 20)
     
     # Check for tight flag consolidation (last 20 days)
     recent_closes = closes[-20:]
@@ -157,20 +103,11 @@ def analyze_flag_detailed(closes, highs, lows):
     recent_lows = lows[-20:]
     
     # Check for higher lows
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
     
-    # Check for ATR contraction
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    # Check for ATR contraction (true range of each flag bar after the first)
+    end_idx = len(closes) - 1
+    atr_values = indicators["true_range"][end_idx - 18:end_idx + 1]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
@@ -185,7 +122,7 @@ def analyze_flag_detailed(closes, highs, lows):
     return {
         "prior_impulse": {
             "detected": impulse_detected,
-            "best_impulse_pct": best_impulse * 100,
+            "best_impulse_pct": best_impulse_pct,
             "required_impulse_pct": 30.0,
             "passed": impulse_detected
         },
@@ -213,32 +150,25 @@ def analyze_flag_detailed(closes, highs, lows):
         "overall_passed": impulse_detected and higher_lows >= 10 and atr_contraction < 1.0 and breakout_above_high
     }
 
-def analyze_range_detailed(closes, highs, lows, volumes, current_price):
+def analyze_range_detailed(closes, highs, lows, volumes, indicators, current_price):
     """Detailed range breakout analysis"""
     # Range tightness (last 30 bars)
-    base_len = 30
-    base_closes = closes[-base_len:]
-    range_high = float(np.max(base_closes))
-    range_low = float(np.min(base_closes))
+    end_idx = len(closes) - 1
+    range_high = float(indicators["range_high"][end_idx])
+    range_low = float(indicators["range_low"][end_idx])
     range_size = range_high - range_low
     range_pct = (range_size / range_low * 100) if range_low > 0 else 0
     tight_base = range_pct <= 15.0  # 15% threshold
     
     # ATR contraction (14d vs 50d)
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = indicators["atr14"][end_idx]
+    # The last complete window ATR covers bars [end_idx-14, end_idx)
+    atr50 = indicators["atr50"][end_idx - 14] if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     contraction_ok = atr_ratio <= 0.8
     
     # Volume expansion
-    vol50 = np.mean(volumes[-51:-1]) if len(volumes) > 50 else np.mean(volumes)
+    vol50 = indicators["vol50"][end_idx - 1] if len(volumes) > 50 else np.mean(volumes)
     vol_mult = volumes[-1] / vol50 if vol50 > 0 else 1
     vol_spike = vol_mult >= 1.5
     
@@ -337,41 +267,26 @@ def main():
     end_date = datetime(2020, 7, 31)
     
     try:
-        # Fetch PRTS data
-        api_key = os.getenv('ALPACA_API_KEY')
-        secret_key = os.getenv('ALPACA_SECRET_KEY')
-        
-        client = StockHistoricalDataClient(api_key, secret_key)
-        
-        # Get data for longer period to have enough history
+        # Fetch PRTS data for a longer period to have enough history
         extended_start = datetime(2020, 5, 1)
+        prts_bars = load_bars("PRTS", extended_start, end_date)
         
-        request = StockBarsRequest(
-            symbol_or_symbols="PRTS",
-            timeframe=TimeFrame.Day,
-            start=extended_start,
-            end=end_date
-        )
-        
-        bars = client.get_stock_bars(request)
-        
-        if not bars or "PRTS" not in bars.data:
+        if not prts_bars:
             print("❌ No PRTS data found")
             return
         
-        prts_bars = bars.data["PRTS"]
         print(f"📊 Fetched {len(prts_bars)} PRTS bars")
         
         # Analyze complete July
         results = analyze_complete_july(prts_bars)
         
         # Print complete analysis
-        print_complete_analysis(results)
+        with buffered_stdout():
+            print_complete_analysis(results)
         
         # Save results
         output_file = Path(__file__).parent / "prts_july_complete_analysis_2020.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        write_json(output_file, results)
         
         print(f"\n💾 Complete July analysis saved to: {output_file}")
         
@@ -3,7 +3,6 @@
 PRTS July 2020 - COMPLETE ALL DAYS Analysis
 Show every single trading day in July 2020 with breakout analysis
 """
-import os
 import sys
 import numpy as np
 from datetime import datetime
@@ -24,38 +23,27 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import bars_to_soa, prior_impulse, true_range, window_atr14
+from _data import load_bars
+
 def get_july_data():
     """Get all PRTS data for July 2020"""
-    api_key = os.getenv('ALPACA_API_KEY')
-    secret_key = os.getenv('ALPACA_SECRET_KEY')
-    
-    client = StockHistoricalDataClient(api_key, secret_key)
-    
     # Get extended data for analysis
-    request = StockBarsRequest(
-        symbol_or_symbols="PRTS",
-        timeframe=TimeFrame.Day,
-        start=datetime(2020, 5, 1),
-        end=datetime(2020, 7, 31)
-    )
-    
-    bars = client.get_stock_bars(request)
-    return bars.data["PRTS"]
+    return load_bars("PRTS", datetime(2020, 5, 1), datetime(2020, 7, 31))
 
 def analyze_complete_july(bars: List[Bar]):
     """Analyze COMPLETE July with all trading days"""
     
-    # Get ALL July bars and sort by date
-    july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
-    july_bars.sort(key=lambda x: x.timestamp.date())
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    
+    # Get ALL July bars
+    july_idx = np.flatnonzero(dates.astype('datetime64[M]') == np.datetime64('2020-07'))
+    july_bars = [bars[idx] for idx in july_idx]
     
     print("📊 PRTS JULY 2020 - COMPLETE ALL TRADING DAYS ANALYSIS")
     print("=" * 90)
@@ -69,16 +57,16 @@ def analyze_complete_july(bars: List[Bar]):
     print("=" * 90)
     
     # Now analyze each day
-    for i, bar in enumerate(july_bars):
+    for i, (idx, bar) in enumerate(zip(july_idx, july_bars)):
         date = bar.timestamp.date()
         price = float(bar.close)
         volume = float(bar.volume)
         
-        # Get historical data up to this point
-        historical_bars = [b for b in bars if b.timestamp.date() <= date]
+        # Number of bars up to this point
+        end = idx + 1
         
-        if len(historical_bars) < 60:
-            print(f"\n⚠️  {date} - Insufficient historical data ({len(historical_bars)} bars)")
+        if end < 60:
+            print(f"\n⚠️  {date} - Insufficient historical data ({end} bars)")
             continue
         
         # Calculate daily change
@@ -92,42 +80,29 @@ def analyze_complete_july(bars: List[Bar]):
         print("-" * 80)
         
         # Analyze breakout criteria
-        analyze_breakout_criteria(historical_bars, price, volume)
+        analyze_breakout_criteria(closes[:end], highs[:end], lows[:end], volumes[:end], price, volume)
 
-def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_volume: float):
-    """Analyze breakout criteria for a specific day"""
+def analyze_breakout_criteria(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray, volumes: np.ndarray,
+                              current_price: float, current_volume: float):
+    """Analyze breakout criteria for a specific day, given the bar arrays up to and including it"""
+    
+    tr = true_range(highs, lows, closes)
     
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
+    recent_closes = closes[-20:]
+    recent_highs = highs[-20:]
+    recent_lows = lows[-20:]
     
     # FLAG BREAKOUT ANALYSIS
     print("🚩 FLAG BREAKOUT:")
     
     # 1. Prior Impulse (30%+ move)
-    impulse_detected = False
-    best_impulse = 0
-    for i in range(20, len(bars) - 20):
-        window_high = np.max(highs[i-20:i+20])
-        window_low = np.min(lows[i-20:i+20])
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low * 100
-            if move_pct > best_impulse:
-                best_impulse = move_pct
-            if move_pct >= 30:
-                impulse_detected = True
-                break
+    best_impulse, impulse_detected = prior_impulse(highs, lows, 20)
     
     impulse_status = "✅" if impulse_detected else "❌"
     print(f"  {impulse_status} Prior Impulse: {best_impulse:.1f}% (Required: ≥30%)")
     
     # 2. Higher Lows (last 20 days)
-    recent_lows = lows[-20:]
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
     
     higher_lows_pct = (higher_lows / len(recent_lows)) * 100
     higher_lows_ok = higher_lows >= 10  # At least half should be higher lows
@@ -135,18 +110,8 @@ def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_vol
     print(f"  {higher_lows_status} Higher Lows: {higher_lows}/{len(recent_lows)} ({higher_lows_pct:.1f}%)")
     
     # 3. ATR Contraction
-    recent_closes = closes[-20:]
-    recent_highs = highs[-20:]
-    recent_lows = lows[-20:]
-    
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    # True range of each flag bar after the first
+    atr_values = tr[-(len(recent_closes) - 1):]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
@@ -181,15 +146,9 @@ def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_vol
     print(f"  {tight_base_status} Tight Base: {range_pct:.1f}% (Required: ≤15%)")
     
     # 2. ATR Contraction (14d vs 50d)
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = np.mean(tr[-14:])
+    # Mean ATR of the last 50 complete 14-bar windows before today
+    atr50 = np.mean(window_atr14(highs, lows, closes, tr)[-51:-1]) if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     range_atr_ok = atr_ratio <= 0.8
     range_atr_status = "✅" if range_atr_ok else "❌"
@@ -3,14 +3,12 @@
 PRTS July 2020 Day-by-Day Breakout Analysis
 Detailed analysis of why no breakouts were detected despite significant moves
 """
-import os
 import sys
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
-import json
 
 # Load environment variables
 try:
@@ -26,61 +24,60 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import (bars_to_soa, buffered_stdout, impulse_moves, precompute_indicators,
+                               scanner_indicators, write_json)
+from _data import load_bars_many
+
 # Import breakout analysis functions
 sys.path.insert(0, str(Path(__file__).parent))
 from breakout.breakout_scanner import (
     detect_flag_breakout_setup, 
-    detect_range_breakout_setup,
-    calculate_rsi,
-    calculate_atr,
-    calculate_z_score,
-    breakout_checklist
+    detect_range_breakout_setup
 )
 
 def analyze_july_day_by_day(bars: List[Bar], spy_bars: List[Bar]) -> Dict:
     """Analyze PRTS July 2020 day by day with detailed breakout criteria"""
     
-    # Filter for July 2020 bars
-    july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
-    july_spy_bars = [bar for bar in spy_bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
+    dates, all_highs, all_lows, all_closes, all_volumes = bars_to_soa(bars)
+    
+    # Positions of the July 2020 bars (bars arrive sorted by date)
+    july_idx = np.flatnonzero(dates.astype('datetime64[M]') == np.datetime64('2020-07'))
     
-    if len(july_bars) < 5:
+    # Rolling indicators over the full history; each day reads its own row
+    indicators = precompute_indicators(all_highs, all_lows, all_closes, all_volumes)
+    scanner = scanner_indicators(all_closes, indicators["true_range"])
+    
+    if len(july_idx) < 5:
         return {"error": "Insufficient July data"}
     
     results = {
         "symbol": "PRTS",
         "month": "July 2020",
-        "total_days": len(july_bars),
+        "total_days": len(july_idx),
         "daily_analysis": []
     }
     
-    # Analyze each July day
-    for i, current_bar in enumerate(july_bars):
-        current_date = current_bar.timestamp.date()
-        
-        # Get all bars up to this point (need history for analysis)
-        historical_bars = [bar for bar in bars if bar.timestamp.date() <= current_date]
+    # Analyze each July day with at least 60 bars of history (up to and including it)
+    for idx in july_idx[july_idx >= 59]:
+        current_date = dates[idx].item()
+        end = idx + 1
         
-        if len(historical_bars) < 60:  # Need at least 60 days of history
-            continue
+        historical_bars = bars[:end]
         
         # Calculate technical indicators
-        closes = [float(bar.close) for bar in historical_bars]
-        highs = [float(bar.high) for bar in historical_bars]
-        lows = [float(bar.low) for bar in historical_bars]
-        volumes = [float(bar.volume) for bar in historical_bars]
+        closes = all_closes[:end]
+        highs = all_highs[:end]
+        lows = all_lows[:end]
+        volumes = all_volumes[:end]
         
-        rsi = calculate_rsi(closes)
-        atr = calculate_atr(highs, lows, closes)
-        z_score = calculate_z_score(closes)
+        rsi = scanner["rsi"][idx]
+        atr = scanner["atr"][idx]
+        z_score = scanner["z_score"][idx]
         
         # Calculate daily change
         if len(closes) >= 2:
@@ -117,7 +114,7 @@ def analyze_july_day_by_day(bars: List[Bar], spy_bars: List[Bar]) -> Dict:
             }
         else:
             # Explain why no flag breakout
-            flag_analysis = analyze_flag_criteria(historical_bars)
+            flag_analysis = analyze_flag_criteria(closes, highs, lows, indicators)
             analysis["breakout_details"]["flag"] = flag_analysis
         
         # Analyze range breakout criteria
@@ -129,38 +126,31 @@ def analyze_july_day_by_day(bars: List[Bar], spy_bars: List[Bar]) -> Dict:
             }
         else:
             # Explain why no range breakout
-            range_analysis = analyze_range_criteria(historical_bars)
+            range_analysis = analyze_range_criteria(closes, highs, lows, volumes, indicators)
             analysis["breakout_details"]["range"] = range_analysis
         
         results["daily_analysis"].append(analysis)
     
     return results
 
-def analyze_flag_criteria(bars: List[Bar]) -> Dict:
+def analyze_flag_criteria(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                          indicators: Dict[str, np.ndarray]) -> Dict:
     """Analyze why flag breakout criteria weren't met"""
-    if len(bars) < 60:
+    if len(closes) < 60:
         return {"error": "Insufficient data"}
     
-    closes = [float(bar.close) for bar in bars]
-    highs = [float(bar.high) for bar in bars]
-    lows = [float(bar.low) for bar in bars]
-    
     # Check for prior impulse (30%+ move in last 60 days)
     impulse_detected = False
     impulse_pct = 0
     impulse_window = None
     
-    for i in range(20, len(bars) - 20):
-        window_high = max(highs[i-20:i+20])
-        window_low = min(lows[i-20:i+20])
-        
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low
-            if move_pct >= 0.30:  # 30%+ move
-                impulse_detected = True
-                impulse_pct = move_pct * 100
-                impulse_window = f"Days {i-20} to {i+20}"
-                break
+    moves = impulse_moves(highs, lows, 20)
+    hits = np.flatnonzero(moves >= 30.0)  # 30%+ move
+    if hits.size:
+        start = int(hits[0])
+        impulse_detected = True
+        impulse_pct = moves[start]
+        impulse_window = f"Days {start} to {start + 40}"
     
     # Check for tight flag consolidation (last 20 days)
     recent_closes = closes[-20:]
@@ -168,28 +158,19 @@ def analyze_flag_criteria(bars: List[Bar]) -> Dict:
     recent_lows = lows[-20:]
     
     # Check for higher lows
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
     
-    # Check for ATR contraction
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    # Check for ATR contraction (true range of each flag bar after the first)
+    end_idx = len(closes) - 1
+    atr_values = indicators["true_range"][end_idx - 18:end_idx + 1]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
     atr_contraction = recent_atr / baseline_atr if baseline_atr > 0 else 1.0
     
     # Check for breakout above recent high
-    recent_high = max(recent_highs)
-    current_price = recent_closes[-1]
+    recent_high = float(np.max(recent_highs))
+    current_price = float(recent_closes[-1])
     breakout_above_high = current_price > recent_high * 1.015  # 1.5% above recent high
     
     return {
@@ -206,41 +187,29 @@ def analyze_flag_criteria(bars: List[Bar]) -> Dict:
         "breakout_distance_pct": ((current_price - recent_high) / recent_high * 100) if recent_high > 0 else 0
     }
 
-def analyze_range_criteria(bars: List[Bar]) -> Dict:
+def analyze_range_criteria(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                           volumes: np.ndarray, indicators: Dict[str, np.ndarray]) -> Dict:
     """Analyze why range breakout criteria weren't met"""
-    if len(bars) < 60:
+    if len(closes) < 60:
         return {"error": "Insufficient data"}
     
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
-    
     # Range tightness (last 30 bars)
-    base_len = 30
-    base_slice = slice(-base_len, None)
-    base_closes = closes[base_slice]
-    range_high = float(np.max(base_closes))
-    range_low = float(np.min(base_closes))
+    end_idx = len(closes) - 1
+    range_high = float(indicators["range_high"][end_idx])
+    range_low = float(indicators["range_low"][end_idx])
     range_size = range_high - range_low
     range_pct = (range_size / range_low * 100) if range_low > 0 else 0
     tight_base = range_pct <= 15.0  # 15% threshold
     
     # ATR contraction (14d vs 50d)
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = indicators["atr14"][end_idx]
+    # The last complete window ATR covers bars [end_idx-14, end_idx)
+    atr50 = indicators["atr50"][end_idx - 14] if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     contraction_ok = atr_ratio <= 0.8
     
     # Volume expansion
-    vol50 = np.mean(volumes[-51:-1]) if len(volumes) > 50 else np.mean(volumes)
+    vol50 = indicators["vol50"][end_idx - 1] if len(volumes) > 50 else np.mean(volumes)
     vol_mult = volumes[-1] / vol50 if vol50 > 0 else 1
     vol_spike = vol_mult >= 1.5
     
@@ -326,53 +295,28 @@ def main():
     end_date = datetime(2020, 7, 31)
     
     try:
-        # Fetch PRTS data
-        api_key = os.getenv('ALPACA_API_KEY')
-        secret_key = os.getenv('ALPACA_SECRET_KEY')
-        
-        client = StockHistoricalDataClient(api_key, secret_key)
-        
-        # Get data for longer period to have enough history
+        # Fetch PRTS and SPY data for a longer period to have enough history
         extended_start = datetime(2020, 5, 1)
+        bars = load_bars_many(["PRTS", "SPY"], extended_start, end_date)
+        prts_bars = bars["PRTS"]
+        spy_bars = bars["SPY"]
         
-        request = StockBarsRequest(
-            symbol_or_symbols="PRTS",
-            timeframe=TimeFrame.Day,
-            start=extended_start,
-            end=end_date
-        )
-        
-        bars = client.get_stock_bars(request)
-        
-        if not bars or "PRTS" not in bars.data:
+        if not prts_bars:
             print("❌ No PRTS data found")
             return
         
-        prts_bars = bars.data["PRTS"]
-        
-        # Get SPY data
-        spy_request = StockBarsRequest(
-            symbol_or_symbols="SPY",
-            timeframe=TimeFrame.Day,
-            start=extended_start,
-            end=end_date
-        )
-        
-        spy_data = client.get_stock_bars(spy_request)
-        spy_bars = spy_data.data["SPY"] if "SPY" in spy_data.data else []
-        
         print(f"📊 Fetched {len(prts_bars)} PRTS bars and {len(spy_bars)} SPY bars")
         
         # Analyze July day by day
         results = analyze_july_day_by_day(prts_bars, spy_bars)
         
         # Print analysis
-        print_july_analysis(results)
+        with buffered_stdout():
+            print_july_analysis(results)
         
         # Save results
         output_file = Path(__file__).parent / "prts_july_analysis_2020.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        write_json(output_file, results)
         
         print(f"\n💾 Detailed July analysis saved to: {output_file}")
         
@@ -3,7 +3,6 @@
 PRTS July 2020 - Early Days Detailed Analysis
 Specific breakdown for July 1, 2, 6, and 7
 """
-import os
 import sys
 import numpy as np
 from datetime import datetime
@@ -24,31 +23,19 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import (bars_to_soa, buffered_stdout, impulse_moves, rolling, true_range,
+                               window_atr14)
+from _data import load_bars
+
 def get_july_data():
     """Get all PRTS data for July 2020"""
-    api_key = os.getenv('ALPACA_API_KEY')
-    secret_key = os.getenv('ALPACA_SECRET_KEY')
-    
-    client = StockHistoricalDataClient(api_key, secret_key)
-    
-    # Get extended data for analysis
-    request = StockBarsRequest(
-        symbol_or_symbols="PRTS",
-        timeframe=TimeFrame.Day,
-        start=datetime(2020, 1, 1),  # Start from January to get enough history
-        end=datetime(2020, 7, 31)
-    )
-    
-    bars = client.get_stock_bars(request)
-    return bars.data["PRTS"]
+    # Start from January to get enough history
+    return load_bars("PRTS", datetime(2020, 1, 1), datetime(2020, 7, 31))
 
 def analyze_specific_days(bars: List[Bar], target_dates: List[str]):
     """Analyze specific days in detail"""
@@ -56,6 +43,16 @@ def analyze_specific_days(bars: List[Bar], target_dates: List[str]):
     # Get July bars and sort by date
     july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
     july_bars.sort(key=lambda x: x.timestamp.date())
+    july_index_by_date = {bar.timestamp.date(): i for i, bar in enumerate(july_bars)}
+    
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    
+    # Trailing means over the full history; each day reads its own row
+    indicators = {
+        "sma20": rolling(closes, 20, np.mean),
+        "sma50": rolling(closes, 50, np.mean),
+        "vol50": rolling(volumes, 50, np.mean),
+    }
     
     print("📊 PRTS JULY 2020 - EARLY DAYS DETAILED ANALYSIS")
     print("=" * 90)
@@ -66,34 +63,25 @@ def analyze_specific_days(bars: List[Bar], target_dates: List[str]):
         target_date = datetime.strptime(target_date_str, "%Y-%m-%d").date()
         
         # Find the bar for this date
-        target_bar = None
-        for bar in july_bars:
-            if bar.timestamp.date() == target_date:
-                target_bar = bar
-                break
-        
-        if not target_bar:
+        july_i = july_index_by_date.get(target_date)
+        if july_i is None:
             print(f"❌ No data found for {target_date}")
             continue
+        target_bar = july_bars[july_i]
         
-        # Get historical data up to this point
-        historical_bars = [b for b in bars if b.timestamp.date() <= target_date]
+        # Number of bars up to this point (bars are sorted by date)
+        end = int(np.searchsorted(dates, np.datetime64(target_date), side='right'))
         
-        if len(historical_bars) < 60:
-            print(f"⚠️  {target_date} - Insufficient historical data ({len(historical_bars)} bars)")
+        if end < 60:
+            print(f"⚠️  {target_date} - Insufficient historical data ({end} bars)")
             continue
         
         # Calculate daily change
         price = float(target_bar.close)
         volume = float(target_bar.volume)
         
-        # Find previous day's close
-        prev_price = None
-        for i, bar in enumerate(july_bars):
-            if bar.timestamp.date() == target_date:
-                if i > 0:
-                    prev_price = float(july_bars[i-1].close)
-                break
+        # Previous July day's close
+        prev_price = float(july_bars[july_i - 1].close) if july_i > 0 else None
         
         if prev_price:
             daily_change = (price - prev_price) / prev_price * 100
@@ -104,15 +92,22 @@ def analyze_specific_days(bars: List[Bar], target_dates: List[str]):
         print("=" * 80)
         
         # Detailed analysis
-        analyze_day_in_detail(historical_bars, price, volume, target_date)
+        analyze_day_in_detail(closes[:end], highs[:end], lows[:end], volumes[:end], indicators,
+                              price, volume, target_date)
 
-def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume: float, date):
-    """Detailed analysis for a specific day"""
+def analyze_day_in_detail(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray, volumes: np.ndarray,
+                          indicators: Dict[str, np.ndarray], current_price: float, current_volume: float, date):
+    """Detailed analysis for a specific day, given the bar arrays up to and including it
+    
+    `indicators` holds full-history trailing means indexed by bar position.
+    """
+    end_idx = len(closes) - 1
+    
+    tr = true_range(highs, lows, closes)
     
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
+    recent_closes = closes[-20:]
+    recent_highs = highs[-20:]
+    recent_lows = lows[-20:]
     
     print("🔍 DETAILED BREAKOUT ANALYSIS:")
     print("-" * 60)
@@ -122,21 +117,18 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # 1. Prior Impulse Analysis
     print("  1. Prior Impulse (Required: ≥30%):")
-    impulse_detected = False
     best_impulse = 0
     impulse_window = None
     
-    for i in range(20, len(bars) - 20):
-        window_high = np.max(highs[i-20:i+20])
-        window_low = np.min(lows[i-20:i+20])
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low * 100
-            if move_pct > best_impulse:
-                best_impulse = move_pct
-                impulse_window = f"Days {i-20} to {i+20}"
-            if move_pct >= 30:
-                impulse_detected = True
-                break
+    # Scan 40-bar windows up to (and including) the first one with a 30%+ move
+    moves = impulse_moves(highs, lows, 20)
+    hits = np.flatnonzero(moves >= 30)
+    impulse_detected = bool(hits.size)
+    scanned = moves[:hits[0] + 1] if impulse_detected else moves
+    if scanned.size and scanned.max() > 0:
+        start = int(np.argmax(scanned))
+        best_impulse = scanned[start]
+        impulse_window = f"Days {start} to {start + 40}"
     
     impulse_status = "✅ PASS" if impulse_detected else "❌ FAIL"
     print(f"     Result: {impulse_status}")
@@ -145,18 +137,10 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # 2. Higher Lows Analysis
     print("\n  2. Higher Lows Pattern (Required: ≥50% of last 20 days):")
-    recent_lows = lows[-20:]
-    higher_lows = 0
-    lower_lows = 0
-    equal_lows = 0
-    
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
-        elif recent_lows[i] < recent_lows[i-1]:
-            lower_lows += 1
-        else:
-            equal_lows += 1
+    low_changes = np.diff(recent_lows)
+    higher_lows = int((low_changes > 0).sum())
+    lower_lows = int((low_changes < 0).sum())
+    equal_lows = len(low_changes) - higher_lows - lower_lows
     
     higher_lows_pct = (higher_lows / len(recent_lows)) * 100
     higher_lows_ok = higher_lows >= 10  # At least half should be higher lows
@@ -172,18 +156,8 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # 3. ATR Contraction Analysis
     print("\n  3. ATR Contraction (Required: <1.0):")
-    recent_closes = closes[-20:]
-    recent_highs = highs[-20:]
-    recent_lows = lows[-20:]
-    
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    # True range of each flag bar after the first
+    atr_values = tr[-(len(recent_closes) - 1):]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
@@ -238,15 +212,9 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # 2. ATR Contraction (Range version)
     print("\n  2. ATR Contraction (Required: ≤0.8):")
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = np.mean(tr[-14:])
+    # Mean ATR of the last 50 complete 14-bar windows before today
+    atr50 = np.mean(window_atr14(highs, lows, closes, tr)[-51:-1]) if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     range_atr_ok = atr_ratio <= 0.8
     range_atr_status = "✅ PASS" if range_atr_ok else "❌ FAIL"
@@ -259,7 +227,7 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # 3. Volume Expansion Analysis
     print("\n  3. Volume Expansion (Required: ≥1.5x):")
-    vol50 = np.mean(volumes[-51:-1]) if len(volumes) > 50 else np.mean(volumes)
+    vol50 = indicators["vol50"][end_idx - 1] if len(volumes) > 50 else np.mean(volumes)
     vol_mult = current_volume / vol50 if vol50 > 0 else 1
     vol_spike_ok = vol_mult >= 1.5
     vol_status = "✅ PASS" if vol_spike_ok else "❌ FAIL"
@@ -294,8 +262,8 @@ def analyze_day_in_detail(bars: List[Bar], current_price: float, current_volume:
     
     # Additional context
     print(f"\n📊 ADDITIONAL CONTEXT:")
-    print(f"  • Price vs 20-day SMA: {((current_price / np.mean(closes[-20:]) - 1) * 100):+.1f}%")
-    print(f"  • Price vs 50-day SMA: {((current_price / np.mean(closes[-50:]) - 1) * 100):+.1f}%")
+    print(f"  • Price vs 20-day SMA: {((current_price / indicators['sma20'][end_idx] - 1) * 100):+.1f}%")
+    print(f"  • Price vs 50-day SMA: {((current_price / indicators['sma50'][end_idx] - 1) * 100):+.1f}%")
     print(f"  • Recent 5-day Performance: {((current_price / closes[-5] - 1) * 100):+.1f}%")
     print(f"  • Recent 10-day Performance: {((current_price / closes[-10] - 1) * 100):+.1f}%")
 
@@ -311,7 +279,8 @@ def main():
         
         # Analyze specific days
         target_dates = ["2020-07-01", "2020-07-02", "2020-07-06", "2020-07-07", "2020-07-08"]
-        analyze_specific_days(bars, target_dates)
+        with buffered_stdout():
+            analyze_specific_days(bars, target_dates)
         
         print("\n" + "=" * 90)
         print("📋 EARLY DAYS SUMMARY:")
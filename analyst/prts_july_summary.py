@@ -3,7 +3,6 @@
 PRTS July 2020 Summary - All Trading Days with Breakout Analysis
 Complete breakdown showing why no breakouts were detected
 """
-import os
 import sys
 import numpy as np
 from datetime import datetime
@@ -24,31 +23,19 @@ ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
 sys.path.insert(0, str(ALPACA_DIR))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
 except ImportError as e:
     print(f"Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import (bars_to_soa, buffered_stdout, prior_impulse, rolling, true_range,
+                               window_atr14)
+from _data import load_bars
+
 def get_july_data():
     """Get all PRTS data for July 2020"""
-    api_key = os.getenv('ALPACA_API_KEY')
-    secret_key = os.getenv('ALPACA_SECRET_KEY')
-    
-    client = StockHistoricalDataClient(api_key, secret_key)
-    
     # Get extended data for analysis
-    request = StockBarsRequest(
-        symbol_or_symbols="PRTS",
-        timeframe=TimeFrame.Day,
-        start=datetime(2020, 5, 1),
-        end=datetime(2020, 7, 31)
-    )
-    
-    bars = client.get_stock_bars(request)
-    return bars.data["PRTS"]
+    return load_bars("PRTS", datetime(2020, 5, 1), datetime(2020, 7, 31))
 
 def analyze_july_breakouts(bars: List[Bar]):
     """Analyze all July days for breakout criteria"""
@@ -56,6 +43,11 @@ def analyze_july_breakouts(bars: List[Bar]):
     # Get July bars
     july_bars = [bar for bar in bars if bar.timestamp.month == 7 and bar.timestamp.year == 2020]
     
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    
+    # Trailing 50-bar volume mean over the full history; each day reads its own row
+    vol50_series = rolling(volumes, 50, np.mean)
+    
     print("📊 PRTS JULY 2020 - COMPLETE BREAKOUT ANALYSIS")
     print("=" * 80)
     print(f"📅 Trading Days: {len(july_bars)}")
@@ -66,10 +58,10 @@ def analyze_july_breakouts(bars: List[Bar]):
         price = float(bar.close)
         volume = float(bar.volume)
         
-        # Get historical data up to this point
-        historical_bars = [b for b in bars if b.timestamp.date() <= date]
+        # Number of bars up to this point (bars are sorted by date)
+        end = int(np.searchsorted(dates, np.datetime64(date), side='right'))
         
-        if len(historical_bars) < 60:
+        if end < 60:
             continue
         
         # Calculate daily change
@@ -83,58 +75,37 @@ def analyze_july_breakouts(bars: List[Bar]):
         print("-" * 60)
         
         # Analyze breakout criteria
-        analyze_breakout_criteria(historical_bars, price, volume)
+        analyze_breakout_criteria(closes[:end], highs[:end], lows[:end], volumes[:end], vol50_series,
+                                  price, volume)
 
-def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_volume: float):
-    """Analyze breakout criteria for a specific day"""
+def analyze_breakout_criteria(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray, volumes: np.ndarray,
+                              vol50_series: np.ndarray, current_price: float, current_volume: float):
+    """Analyze breakout criteria for a specific day, given the bar arrays up to and including it"""
+    end_idx = len(closes) - 1
+    
+    tr = true_range(highs, lows, closes)
     
-    closes = np.array([float(bar.close) for bar in bars])
-    highs = np.array([float(bar.high) for bar in bars])
-    lows = np.array([float(bar.low) for bar in bars])
-    volumes = np.array([float(bar.volume) for bar in bars])
+    recent_closes = closes[-20:]
+    recent_highs = highs[-20:]
+    recent_lows = lows[-20:]
     
     # FLAG BREAKOUT ANALYSIS
     print("🚩 FLAG BREAKOUT:")
     
     # 1. Prior Impulse (30%+ move)
-    impulse_detected = False
-    best_impulse = 0
-    for i in range(20, len(bars) - 20):
-        window_high = np.max(highs[i-20:i+20])
-        window_low = np.min(lows[i-20:i+20])
-        if window_high > window_low:
-            move_pct = (window_high - window_low) / window_low * 100
-            if move_pct > best_impulse:
-                best_impulse = move_pct
-            if move_pct >= 30:
-                impulse_detected = True
-                break
+    best_impulse, impulse_detected = prior_impulse(highs, lows, 20)
     
     print(f"  ✅ Prior Impulse: {best_impulse:.1f}% (Required: ≥30%)")
     
     # 2. Higher Lows (last 20 days)
-    recent_lows = lows[-20:]
-    higher_lows = 0
-    for i in range(1, len(recent_lows)):
-        if recent_lows[i] > recent_lows[i-1]:
-            higher_lows += 1
+    higher_lows = int((np.diff(recent_lows) > 0).sum())
     
     higher_lows_pct = (higher_lows / len(recent_lows)) * 100
     print(f"  ✅ Higher Lows: {higher_lows}/{len(recent_lows)} ({higher_lows_pct:.1f}%)")
     
     # 3. ATR Contraction
-    recent_closes = closes[-20:]
-    recent_highs = highs[-20:]
-    recent_lows = lows[-20:]
-    
-    atr_values = []
-    for i in range(1, len(recent_closes)):
-        tr = max(
-            recent_highs[i] - recent_lows[i],
-            abs(recent_highs[i] - recent_closes[i-1]),
-            abs(recent_lows[i] - recent_closes[i-1])
-        )
-        atr_values.append(tr)
+    # True range of each flag bar after the first
+    atr_values = tr[-(len(recent_closes) - 1):]
     
     recent_atr = np.mean(atr_values[-10:]) if len(atr_values) >= 10 else 0
     baseline_atr = np.mean(atr_values[:10]) if len(atr_values) >= 10 else 0
@@ -163,21 +134,15 @@ def analyze_breakout_criteria(bars: List[Bar], current_price: float, current_vol
     print(f"  ❌ Tight Base: {range_pct:.1f}% (Required: ≤15%)")
     
     # 2. ATR Contraction (14d vs 50d)
-    def _atr(h, l, c, n=14):
-        prev = np.roll(c, 1)
-        prev[0] = c[0]
-        tr = np.maximum.reduce([h - l, abs(h - prev), abs(l - prev)])
-        return np.mean(tr[-n:])
-    
-    atr14 = _atr(highs, lows, closes, 14)
-    atr50 = np.mean([_atr(highs[i-14:i], lows[i-14:i], closes[i-14:i])
-                     for i in range(14, len(closes))][-50:]) if len(closes) > 63 else atr14
+    atr14 = np.mean(tr[-14:])
+    # Mean ATR of the last 50 complete 14-bar windows before today
+    atr50 = np.mean(window_atr14(highs, lows, closes, tr)[-51:-1]) if len(closes) > 63 else atr14
     atr_ratio = atr14 / atr50 if atr50 > 0 else 1.0
     
     print(f"  ❌ ATR Contraction: {atr_ratio:.3f} (Required: ≤0.8)")
     
     # 3. Volume Expansion (≥1.5x)
-    vol50 = np.mean(volumes[-51:-1]) if len(volumes) > 50 else np.mean(volumes)
+    vol50 = vol50_series[end_idx - 1] if len(volumes) > 50 else np.mean(volumes)
     vol_mult = current_volume / vol50 if vol50 > 0 else 1
     
     print(f"  ❌ Volume Expansion: {vol_mult:.1f}x (Required: ≥1.5x)")
@@ -201,7 +166,8 @@ def main():
         print(f"📊 Fetched {len(bars)} total bars")
         
         # Analyze July breakouts
-        analyze_july_breakouts(bars)
+        with buffered_stdout():
+            analyze_july_breakouts(bars)
         
         print("\n" + "=" * 80)
         print("📋 SUMMARY:")
@@ -12,8 +12,10 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
-def create_optimized_schema():
-    """Create optimized database schema for breakout scanners"""
+from _breakout_kernels import rolling, true_range
+
+def create_table_sql():
+    """Create the price table for breakout scanners"""
     
     schema = """
     CREATE TABLE IF NOT EXISTS nasdaq_prices (
@@ -38,7 +40,14 @@ def create_optimized_schema():
         
         PRIMARY KEY (symbol, date)
     );
+    """
+    
+    return schema
+
+def create_indexes_sql():
+    """Create optimized indexes, built once the table has been loaded"""
     
+    indexes = """
     -- Optimized indexes for breakout scanner queries
     CREATE INDEX IF NOT EXISTS idx_np_date ON nasdaq_prices(date);
     CREATE INDEX IF NOT EXISTS idx_np_symbol ON nasdaq_prices(symbol);
@@ -50,7 +59,7 @@ def create_optimized_schema():
     CREATE INDEX IF NOT EXISTS idx_np_date_symbol ON nasdaq_prices(date, symbol);
     """
     
-    return schema
+    return indexes
 
 def simulate_original_data():
     """Simulate the original monthly database data structure"""
@@ -64,14 +73,8 @@ def simulate_original_data():
     end_date = datetime(2025, 10, 17)
     start_date = end_date - timedelta(days=90)
     
-    # Generate date range (trading days only)
-    dates = []
-    current_date = start_date
-    while current_date <= end_date:
-        # Skip weekends
-        if current_date.weekday() < 5:  # Monday = 0, Friday = 4
-            dates.append(current_date.strftime('%Y-%m-%d'))
-        current_date += timedelta(days=1)
+    # Generate date range (trading days only, i.e. weekdays)
+    dates = pd.bdate_range(start_date, end_date).strftime('%Y-%m-%d').tolist()
     
     print(f"📅 Generated {len(dates)} trading days from {dates[0]} to {dates[-1]}")
     
@@ -86,40 +89,34 @@ def simulate_original_data():
     
     print(f"📊 Using {len(symbols)} symbols for simulation")
     
-    # Generate sample data
-    data = []
-    np.random.seed(42)  # For reproducible results
-    
-    for symbol in symbols:
-        # Generate realistic price data
-        base_price = np.random.uniform(10, 500)  # Random base price between $10-$500
-        
-        for date in dates:
-            # Generate realistic OHLCV data
-            daily_return = np.random.normal(0, 0.02)  # 2% daily volatility
-            base_price *= (1 + daily_return)
-            
-            # Generate OHLC from close price
-            close = max(1.0, base_price)  # Ensure positive price
-            high = close * np.random.uniform(1.0, 1.05)  # High 0-5% above close
-            low = close * np.random.uniform(0.95, 1.0)   # Low 0-5% below close
-            open_price = np.random.uniform(low, high)    # Open between low and high
-            
-            # Generate volume
-            volume = int(np.random.uniform(100000, 10000000))  # 100K to 10M volume
-            
-            data.append({
-                'symbol': symbol,
-                'date': date,
-                'open': round(open_price, 2),
-                'high': round(high, 2),
-                'low': round(low, 2),
-                'close': round(close, 2),
-                'volume': volume,
-                'adjusted_close': round(close, 2)
-            })
-    
-    df = pd.DataFrame(data)
+    # Generate sample data as one (symbol, date) grid per field
+    rng = np.random.default_rng(42)  # For reproducible results
+    n_symbols, n_dates = len(symbols), len(dates)
+    shape = (n_symbols, n_dates)
+    
+    # Random-walk prices from a $10-$500 base with 2% daily volatility
+    base_prices = rng.uniform(10, 500, n_symbols)
+    paths = base_prices[:, None] * np.cumprod(1 + rng.normal(0, 0.02, shape), axis=1)
+    
+    # Generate OHLC from close price
+    closes = np.maximum(1.0, paths)  # Ensure positive price
+    highs = closes * rng.uniform(1.0, 1.05, shape)  # High 0-5% above close
+    lows = closes * rng.uniform(0.95, 1.0, shape)   # Low 0-5% below close
+    opens = rng.uniform(lows, highs)                # Open between low and high
+    
+    # Generate volume
+    volumes = rng.integers(100000, 10000000, shape)  # 100K to 10M volume
+    
+    df = pd.DataFrame({
+        'symbol': np.repeat(symbols, n_dates),
+        'date': np.tile(dates, n_symbols),
+        'open': opens.ravel().round(2),
+        'high': highs.ravel().round(2),
+        'low': lows.ravel().round(2),
+        'close': closes.ravel().round(2),
+        'volume': volumes.ravel(),
+        'adjusted_close': closes.ravel().round(2)
+    })
     print(f"✅ Generated {len(df)} records")
     
     return df
@@ -129,75 +126,51 @@ def calculate_technical_indicators(df: pd.DataFrame):
     
     print("📊 Calculating technical indicators...")
     
-    # Sort by symbol and date
-    df = df.sort_values(['symbol', 'date'])
+    # Sort by symbol and date so each symbol's bars form one contiguous block
+    df = df.sort_values(['symbol', 'date']).reset_index(drop=True)
     
     # Calculate technical indicators for each symbol
-    def calc_indicators_for_symbol(group):
-        closes = group['close'].values
-        highs = group['high'].values
-        lows = group['low'].values
-        
-        # Initialize arrays
-        rsi_values = [np.nan] * len(closes)
-        atr_values = [np.nan] * len(closes)
-        sma20_values = [np.nan] * len(closes)
-        sma50_values = [np.nan] * len(closes)
+    def calc_indicators_for_symbol(closes, highs, lows):
+        # RSI (14-period): mean gain/loss of the 14 changes ending at each bar,
+        # computed for every bar in one rolling pass
+        deltas = np.diff(closes)
+        avg_gain = rolling(np.where(deltas > 0, deltas, 0), 14, np.mean)
+        avg_loss = rolling(np.where(deltas < 0, -deltas, 0), 14, np.mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100, 100 - (100 / (1 + avg_gain / avg_loss)))
+        rsi_values = np.concatenate(([np.nan], rsi))
         
-        # RSI (14-period)
-        for i in range(14, len(closes)):
-            deltas = np.diff(closes[i-14:i+1])
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
-            
-            avg_gain = np.mean(gains)
-            avg_loss = np.mean(losses)
-            
-            if avg_loss == 0:
-                rsi = 100
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-            
-            rsi_values[i] = rsi
+        # ATR as 14-period SMA of the true range, reported from bar 14 onwards
+        atr_values = rolling(true_range(highs, lows, closes), 14, np.mean)
+        atr_values[:14] = np.nan
         
-        # ATR (14-period)
-        tr_values = []
-        for i in range(len(closes)):
-            if i == 0:
-                tr_values.append(highs[i] - lows[i])
-            else:
-                tr = max(
-                    highs[i] - lows[i],
-                    abs(highs[i] - closes[i-1]),
-                    abs(lows[i] - closes[i-1])
-                )
-                tr_values.append(tr)
+        # SMA 20 and 50, reported from bar 20 / bar 50 onwards
+        sma20_values = rolling(closes, 20, np.mean)
+        sma20_values[:20] = np.nan
+        sma50_values = rolling(closes, 50, np.mean)
+        sma50_values[:50] = np.nan
         
-        # Calculate ATR as 14-period SMA of TR
-        for i in range(14, len(closes)):
-            atr = np.mean(tr_values[i-13:i+1])
-            atr_values[i] = atr
-        
-        # SMA 20 and 50
-        for i in range(20, len(closes)):
-            sma20_values[i] = np.mean(closes[i-19:i+1])
-        
-        for i in range(50, len(closes)):
-            sma50_values[i] = np.mean(closes[i-49:i+1])
-        
-        group['rsi'] = rsi_values
-        group['atr'] = atr_values
-        group['sma_20'] = sma20_values
-        group['sma_50'] = sma50_values
-        
-        return group
+        return rsi_values, atr_values, sma20_values, sma50_values
+    
+    closes = df['close'].to_numpy()
+    highs = df['high'].to_numpy()
+    lows = df['low'].to_numpy()
+    _, starts = np.unique(df['symbol'].to_numpy(), return_index=True)
+    ends = np.append(starts[1:], len(df))
     
-    # Apply to each symbol
-    result_df = df.groupby('symbol').apply(calc_indicators_for_symbol, include_groups=False).reset_index(drop=True)
+    # Fill each symbol's block of the output columns
+    rsi, atr, sma20, sma50 = (np.full(len(df), np.nan) for _ in range(4))
+    for start, end in zip(starts, ends):
+        rsi[start:end], atr[start:end], sma20[start:end], sma50[start:end] = calc_indicators_for_symbol(
+            closes[start:end], highs[start:end], lows[start:end])
+    
+    df['rsi'] = rsi
+    df['atr'] = atr
+    df['sma_20'] = sma20
+    df['sma_50'] = sma50
     
     print(f"✅ Technical indicators calculated")
-    return result_df
+    return df
 
 def create_complete_nasdaq_database(df: pd.DataFrame):
     """Create the complete nasdaq.db database"""
@@ -214,15 +187,28 @@ def create_complete_nasdaq_database(df: pd.DataFrame):
     # Create new database with optimized schema
     conn = sqlite3.connect(db_path)
     
+    # Bulk-load settings: the file is rebuilt from scratch, so favour write speed
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
+    
     # Execute schema
-    schema = create_optimized_schema()
-    conn.executescript(schema)
+    conn.executescript(create_table_sql())
+    
+    # Insert data in a single transaction, packing many rows into each INSERT
+    # (chunks stay under the 999 bound-parameter limit of older SQLite builds)
+    with conn:
+        df.to_sql('nasdaq_prices', conn, if_exists='append', index=False,
+                  method='multi', chunksize=999 // len(df.columns))
     
-    # Insert data
-    df.to_sql('nasdaq_prices', conn, if_exists='append', index=False)
+    # Build indexes after the bulk load rather than maintaining them per row
+    conn.executescript(create_indexes_sql())
     
-    # Create additional indexes for performance
-    conn.execute("ANALYZE;")
+    # Gather planner statistics now that the indexes exist; analysis_limit makes
+    # ANALYZE sample each index instead of scanning it in full
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
     
     conn.close()
     
@@ -8,10 +8,13 @@ import sys
 import sqlite3
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 
 # Load environment variables
@@ -37,17 +40,28 @@ except ImportError as e:
     print(f"❌ Error importing Alpaca modules: {e}")
     sys.exit(1)
 
+from _breakout_kernels import true_range, wilder_smooth
+
+# Consolidated 90-day price database maintained by this updater
+DB_PATH = Path(__file__).parent / "nasdaq_db" / "nasdaq.db"
+
 class RobustDatabaseUpdater:
     """Robust database updater with comprehensive error handling"""
     
     def __init__(self):
-        self.db_path = Path(__file__).parent / "nasdaq_db" / "nasdaq.db"
+        self.db_path = DB_PATH
         self.log_file = Path(__file__).parent / "logs" / "robust_update.log"
         self.log_file.parent.mkdir(exist_ok=True)
         
+        # Log file stays open for the updater's lifetime; log() is also called
+        # from the batch fetch threads
+        self._log_handle = open(self.log_file, 'a')
+        self._log_lock = threading.Lock()
+        
         # Configuration
         self.max_retries = 3
         self.batch_size = 50
+        self.max_workers = 8  # concurrent batch requests
         self.max_api_errors = 10
         self.min_success_rate = 0.8  # 80% success rate required
         
@@ -56,11 +70,17 @@ class RobustDatabaseUpdater:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entry = f"[{timestamp}] {level}: {message}\n"
         
-        with open(self.log_file, 'a') as f:
-            f.write(log_entry)
+        with self._log_lock:
+            self._log_handle.write(log_entry)
+            if level == "ERROR":
+                self._log_handle.flush()
         
         print(f"{'🔴' if level == 'ERROR' else '🟡' if level == 'WARNING' else '🔵'} {message}")
     
+    def close(self):
+        """Flush and close the log file"""
+        self._log_handle.close()
+    
     def get_database_status(self) -> Dict:
         """Get current database status"""
         if not self.db_path.exists():
@@ -127,6 +147,7 @@ class RobustDatabaseUpdater:
         
         batch_data = []
         api_errors = 0
+        target_date_only = target_date.date()
         
         # Try multiple date ranges
         date_ranges = [
@@ -150,18 +171,11 @@ class RobustDatabaseUpdater:
                     for symbol, symbol_bars in bars.data.items():
                         if symbol_bars:
                             # Find closest bar to target date
-                            target_date_only = target_date.date()
-                            closest_bar = None
-                            min_diff = float('inf')
+                            closest_bar = min(symbol_bars,
+                                              key=lambda bar: abs((bar.timestamp.date() - target_date_only).days))
+                            min_diff = abs((closest_bar.timestamp.date() - target_date_only).days)
                             
-                            for bar in symbol_bars:
-                                bar_date = bar.timestamp.date()
-                                diff = abs((bar_date - target_date_only).days)
-                                if diff < min_diff:
-                                    min_diff = diff
-                                    closest_bar = bar
-                            
-                            if closest_bar and min_diff <= 1:  # Within 1 day
+                            if min_diff <= 1:  # Within 1 day
                                 batch_data.append({
                                     'symbol': symbol,
                                     'date': target_date_only.strftime('%Y-%m-%d'),
@@ -196,25 +210,32 @@ class RobustDatabaseUpdater:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # Get existing data for technical indicators
-            existing_df = pd.read_sql_query("SELECT * FROM nasdaq_prices ORDER BY symbol, date", conn)
+            # Autocommit mode: multi-statement writes below open their transaction explicitly
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
             
-            # Add new data
             new_df = pd.DataFrame(new_data)
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-            combined_df = combined_df.sort_values(['symbol', 'date'])
+            price_columns = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume', 'adjusted_close']
             
-            # Calculate technical indicators
-            updated_df = self.calculate_technical_indicators(combined_df, target_date)
-            
-            # Insert new records
-            new_records = updated_df[updated_df['date'] == target_date]
-            
-            if not new_records.empty:
-                new_records.to_sql('nasdaq_prices', conn, if_exists='append', index=False)
-                self.log(f"Added {len(new_records)} records for {target_date}")
+            # Insert (or re-insert) new records, then read the price history back
+            # through the same transaction to compute their indicators, and fill
+            # those in with one batched UPDATE
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(f"""
+                    INSERT OR REPLACE INTO nasdaq_prices ({', '.join(price_columns)})
+                    VALUES ({', '.join('?' * len(price_columns))})
+                """, new_df[price_columns].itertuples(index=False, name=None))
+                
+                # Only the columns the indicators use
+                history_df = pd.read_sql_query(
+                    "SELECT symbol, date, high, low, close FROM nasdaq_prices ORDER BY symbol, date", conn)
+                indicator_rows = self.calculate_technical_indicators(history_df, target_date)
+                
+                conn.executemany("""
+                    UPDATE nasdaq_prices SET rsi = ?, atr = ?, z_score = ?, adr_pct = ?
+                    WHERE symbol = ? AND date = ?
+                """, indicator_rows)
+            self.log(f"Added {len(new_df)} records for {target_date}")
             
             # Remove oldest day to maintain 90-day window
             self.remove_oldest_day(conn)
@@ -226,57 +247,54 @@ class RobustDatabaseUpdater:
             self.log(f"Database update failed: {e}", "ERROR")
             return False
     
-    def calculate_technical_indicators(self, df: pd.DataFrame, target_date: str) -> pd.DataFrame:
-        """Calculate technical indicators for target date"""
-        target_df = df[df['date'] == target_date].copy()
-        
-        if target_df.empty:
-            return df
-        
-        for symbol in target_df['symbol'].unique():
-            symbol_data = df[df['symbol'] == symbol].sort_values('date')
+    def calculate_technical_indicators(self, df: pd.DataFrame, target_date: str) -> List[Tuple]:
+        """Calculate technical indicators for target date
+        
+        Returns one (rsi, atr, z_score, adr_pct, symbol, date) row per symbol
+        with enough history, ready for the UPDATE in update_database.
+        """
+        df = df.sort_values(['symbol', 'date'])
+        target_symbols = df.loc[df['date'] == target_date, 'symbol'].unique()
+        indicator_rows = []
+        
+        # Date-ordered row positions of each symbol, looked up instead of
+        # scanning the whole frame per symbol
+        symbol_rows = df.groupby('symbol', sort=False).indices
+        all_closes = df['close'].to_numpy()
+        all_hlc = df[['high', 'low', 'close']].to_numpy()
+        
+        # Output buffers reused for every symbol; no series is longer than the
+        # longest symbol history
+        history_len = max(len(rows) for rows in symbol_rows.values())
+        rsi_buf, atr_buf, z_buf, adr_buf = (np.empty(history_len) for _ in range(4))
+        
+        for symbol in target_symbols:
+            rows = symbol_rows[symbol]
             
-            if len(symbol_data) < 20:
+            if len(rows) < 20:
                 continue
             
-            target_idx = target_df[target_df['symbol'] == symbol].index[0]
-            
-            # Calculate RSI
-            if len(symbol_data) >= 14:
-                rsi = self.calculate_rsi(symbol_data['close'].values, 14)
-                if len(rsi) > 0:
-                    df.loc[target_idx, 'rsi'] = rsi[-1]
+            closes = all_closes[rows]
+            hlc = all_hlc[rows]
             
-            # Calculate ATR
-            if len(symbol_data) >= 14:
-                atr = self.calculate_atr(symbol_data[['high', 'low', 'close']].values, 14)
-                if len(atr) > 0:
-                    df.loc[target_idx, 'atr'] = atr[-1]
+            n = len(closes)
+            rsi = self.calculate_rsi(closes, 14, out=rsi_buf[:n - 14])
+            atr = self.calculate_atr(hlc, 14, out=atr_buf[:n - 14])
+            z_score = self.calculate_z_score(closes, 20, out=z_buf[:n - 19])
+            adr = self.calculate_adr_pct(hlc, 20, out=adr_buf[:n - 19])
             
-            # Calculate Z-Score
-            if len(symbol_data) >= 20:
-                z_score = self.calculate_z_score(symbol_data['close'].values, 20)
-                if len(z_score) > 0:
-                    df.loc[target_idx, 'z_score'] = z_score[-1]
-            
-            # Calculate ADR
-            if len(symbol_data) >= 20:
-                adr = self.calculate_adr_pct(symbol_data[['high', 'low', 'close']].values, 20)
-                if len(adr) > 0:
-                    df.loc[target_idx, 'adr_pct'] = adr[-1]
+            indicator_rows.append((rsi[-1], atr[-1], z_score[-1], adr[-1], symbol, target_date))
         
-        return df
+        return indicator_rows
     
     def remove_oldest_day(self, conn: sqlite3.Connection):
         """Remove oldest day to maintain 90-day window"""
         try:
             oldest_date = conn.execute("SELECT MIN(date) FROM nasdaq_prices").fetchone()[0]
-            count_before = conn.execute("SELECT COUNT(*) FROM nasdaq_prices").fetchone()[0]
-            
-            conn.execute("DELETE FROM nasdaq_prices WHERE date = ?", (oldest_date,))
             
-            count_after = conn.execute("SELECT COUNT(*) FROM nasdaq_prices").fetchone()[0]
-            deleted_count = count_before - count_after
+            # A single statement commits on its own; rowcount replaces the before/after
+            # COUNT(*) scans
+            deleted_count = conn.execute("DELETE FROM nasdaq_prices WHERE date = ?", (oldest_date,)).rowcount
             
             if deleted_count > 0:
                 self.log(f"Removed {deleted_count} records from {oldest_date}")
@@ -284,8 +302,9 @@ class RobustDatabaseUpdater:
         except Exception as e:
             self.log(f"Failed to remove oldest day: {e}", "WARNING")
     
-    def calculate_rsi(self, prices: np.ndarray, period: int = 14) -> np.ndarray:
-        """Calculate RSI indicator"""
+    def calculate_rsi(self, prices: np.ndarray, period: int = 14,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate RSI indicator, into `out` (len(prices) - period values) if given"""
         if len(prices) < period + 1:
             return np.array([])
         
@@ -293,78 +312,59 @@ class RobustDatabaseUpdater:
         gains = np.where(deltas > 0, deltas, 0)
         losses = np.where(deltas < 0, -deltas, 0)
         
-        avg_gain = np.mean(gains[:period])
-        avg_loss = np.mean(losses[:period])
+        avg_gain = wilder_smooth(gains, period)
+        avg_loss = wilder_smooth(losses, period)
         
-        rsi = np.zeros(len(prices) - period)
-        
-        for i in range(period, len(prices)):
-            if avg_loss == 0:
-                rsi[i - period] = 100
-            else:
-                rs = avg_gain / avg_loss
-                rsi[i - period] = 100 - (100 / (1 + rs))
-            
-            if i < len(prices) - 1:
-                avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-                avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+        rsi = np.empty(len(prices) - period) if out is None else out
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi[:] = np.where(avg_loss == 0, 100, 100 - (100 / (1 + avg_gain / avg_loss)))
         
         return rsi
     
-    def calculate_atr(self, hlc: np.ndarray, period: int = 14) -> np.ndarray:
-        """Calculate ATR indicator"""
+    def calculate_atr(self, hlc: np.ndarray, period: int = 14,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate ATR indicator, into `out` (len(hlc) - period values) if given"""
         if len(hlc) < period + 1:
             return np.array([])
         
         high, low, close = hlc[:, 0], hlc[:, 1], hlc[:, 2]
         
-        tr = np.maximum(high[1:] - low[1:], 
-                       np.maximum(np.abs(high[1:] - close[:-1]), 
-                                 np.abs(low[1:] - close[:-1])))
-        
-        atr = np.zeros(len(tr) - period + 1)
-        atr[0] = np.mean(tr[:period])
-        
-        for i in range(1, len(atr)):
-            atr[i] = (atr[i-1] * (period - 1) + tr[period + i - 1]) / period
+        # True range against the previous close, from the second bar on
+        tr = true_range(high, low, close)[1:]
         
-        return atr
+        return wilder_smooth(tr, period, out=out)
     
-    def calculate_z_score(self, prices: np.ndarray, period: int = 20) -> np.ndarray:
-        """Calculate Z-Score indicator"""
+    def calculate_z_score(self, prices: np.ndarray, period: int = 20,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate Z-Score indicator, into `out` (len(prices) - period + 1 values) if given"""
         if len(prices) < period:
             return np.array([])
         
-        z_scores = np.zeros(len(prices) - period + 1)
+        # Mean/std of every trailing window at once
+        windows = sliding_window_view(prices, period)
+        mean = windows.mean(axis=-1)
+        std = windows.std(axis=-1)
         
-        for i in range(period - 1, len(prices)):
-            window = prices[i - period + 1:i + 1]
-            mean = np.mean(window)
-            std = np.std(window)
-            
-            if std > 0:
-                z_scores[i - period + 1] = (prices[i] - mean) / std
-            else:
-                z_scores[i - period + 1] = 0
+        z_scores = np.empty(len(prices) - period + 1) if out is None else out
+        np.subtract(prices[period - 1:], mean, out=z_scores)
+        np.divide(z_scores, std, out=z_scores, where=std > 0)
+        z_scores[~(std > 0)] = 0
         
         return z_scores
     
-    def calculate_adr_pct(self, hlc: np.ndarray, period: int = 20) -> np.ndarray:
-        """Calculate ADR percentage indicator"""
+    def calculate_adr_pct(self, hlc: np.ndarray, period: int = 20,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate ADR percentage indicator, into `out` (len(hlc) - period + 1 values) if given"""
         if len(hlc) < period:
             return np.array([])
         
         high, low, close = hlc[:, 0], hlc[:, 1], hlc[:, 2]
         
-        adr_pct = np.zeros(len(hlc) - period + 1)
+        adr_pct = np.empty(len(hlc) - period + 1) if out is None else out
         
-        for i in range(period - 1, len(hlc)):
-            window_high = high[i - period + 1:i + 1]
-            window_low = low[i - period + 1:i + 1]
-            window_close = close[i - period + 1:i + 1]
-            
-            daily_ranges = (window_high - window_low) / window_close
-            adr_pct[i - period + 1] = np.mean(daily_ranges) * 100
+        daily_ranges = (high - low) / close
+        sliding_window_view(daily_ranges, period).mean(axis=-1, out=adr_pct)
+        adr_pct *= 100
         
         return adr_pct
     
@@ -406,25 +406,27 @@ class RobustDatabaseUpdater:
         if not client:
             return False
         
-        # Fetch data in batches
+        # Fetch data in batches; the batches are independent network requests,
+        # so they run concurrently and are collected in submission order
         all_data = []
         successful_batches = 0
-        total_batches = (len(symbols) + self.batch_size - 1) // self.batch_size
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        total_batches = len(batches)
         
-        for i in range(0, len(symbols), self.batch_size):
-            batch_symbols = symbols[i:i + self.batch_size]
-            batch_num = i // self.batch_size + 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_batch_data, client, batch_symbols, target_date)
+                       for batch_symbols in batches]
             
-            self.log(f"Processing batch {batch_num}/{total_batches} ({len(batch_symbols)} symbols)")
-            
-            batch_data = self.fetch_batch_data(client, batch_symbols, target_date)
-            
-            if batch_data:
-                all_data.extend(batch_data)
-                successful_batches += 1
-                self.log(f"Batch {batch_num}: {len(batch_data)} records")
-            else:
-                self.log(f"Batch {batch_num}: No data found", "WARNING")
+            # Log each batch next to its outcome, in submission order
+            for batch_num, (batch_symbols, future) in enumerate(zip(batches, futures), 1):
+                self.log(f"Processing batch {batch_num}/{total_batches} ({len(batch_symbols)} symbols)")
+                batch_data = future.result()
+                if batch_data:
+                    all_data.extend(batch_data)
+                    successful_batches += 1
+                    self.log(f"Batch {batch_num}: {len(batch_data)} records")
+                else:
+                    self.log(f"Batch {batch_num}: No data found", "WARNING")
         
         # Check success rate
         success_rate = successful_batches / total_batches
@@ -450,7 +452,10 @@ class RobustDatabaseUpdater:
 def main():
     """Main function"""
     updater = RobustDatabaseUpdater()
-    success = updater.run_update()
+    try:
+        success = updater.run_update()
+    finally:
+        updater.close()
     
     if success:
         print("✅ Database update completed successfully")
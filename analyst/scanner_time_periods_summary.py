@@ -3,41 +3,44 @@
 Breakout Scanner Time Periods Summary
 Shows the different time periods and lookback windows used in the scanners
 """
-import pandas as pd
+from typing import Sequence, Tuple
+
+COLUMNS = ("Time Period", "Flag Breakout", "Range Breakout", "Description")
+
+# Time periods used by the scanners
+PERIODS = (
+    ("Minimum Data Required", "60 days", "60 days", "Both require 60+ days of historical data"),
+    ("Base Analysis Window", "20 days", "20 days", "Recent price consolidation analysis"),
+    ("Prior Impulse Detection", "60 days", "N/A", "Flag: 30%+ move in last 60 days, Range: No impulse required"),
+    ("Impulse Window Size", "40 days", "N/A", "20-day windows within 60-day lookback for Flag"),
+    ("ATR Calculation Period", "14 days", "14 days", "Average True Range calculation"),
+    ("ATR Moving Average", "50 days", "50 days", "ATR smoothed over 50 days"),
+    ("Volume Moving Average", "50 days", "50 days", "Volume smoothed over 50 days"),
+    ("Higher Lows Analysis", "20 days", "20 days", "Pattern detection within base window"),
+    ("Market Filter", "10/20 days", "10/20 days", "Benchmark 10DMA vs 20DMA comparison"),
+    ("Relative Strength", "50 days", "50 days", "Price/benchmark vs 50-day RS average"),
+    ("Total Lookback", "~110 days", "~90 days", "Maximum historical data needed"),
+    ("Effective Analysis", "~3.5 months", "~3 months", "Rough estimate for sufficient data"),
+)
+
+def format_table(columns: Sequence[str], rows: Sequence[Tuple[str, ...]]) -> str:
+    """Right-aligned plain-text table laid out like DataFrame.to_string(index=False)"""
+    widths = [max(len(cell) for cell in column) for column in zip(columns, *rows)]
+    return "\n".join(" ".join(cell.rjust(width) for cell, width in zip(row, widths))
+                     for row in (columns, *rows))
+
+# The table never changes at runtime, so it is formatted once at import
+TIME_PERIODS_TABLE = format_table(COLUMNS, PERIODS)
 
 def create_time_periods_summary():
     """Create a summary table of scanner time periods"""
     
-    # Define the time periods
-    periods = [
-        ("Minimum Data Required", "60 days", "60 days", "Both require 60+ days of historical data"),
-        ("Base Analysis Window", "20 days", "20 days", "Recent price consolidation analysis"),
-        ("Prior Impulse Detection", "60 days", "N/A", "Flag: 30%+ move in last 60 days, Range: No impulse required"),
-        ("Impulse Window Size", "40 days", "N/A", "20-day windows within 60-day lookback for Flag"),
-        ("ATR Calculation Period", "14 days", "14 days", "Average True Range calculation"),
-        ("ATR Moving Average", "50 days", "50 days", "ATR smoothed over 50 days"),
-        ("Volume Moving Average", "50 days", "50 days", "Volume smoothed over 50 days"),
-        ("Higher Lows Analysis", "20 days", "20 days", "Pattern detection within base window"),
-        ("Market Filter", "10/20 days", "10/20 days", "Benchmark 10DMA vs 20DMA comparison"),
-        ("Relative Strength", "50 days", "50 days", "Price/benchmark vs 50-day RS average"),
-        ("Total Lookback", "~110 days", "~90 days", "Maximum historical data needed"),
-        ("Effective Analysis", "~3.5 months", "~3 months", "Rough estimate for sufficient data")
-    ]
-    
-    # Create DataFrame
-    df = pd.DataFrame(periods, columns=[
-        "Time Period", 
-        "Flag Breakout", 
-        "Range Breakout", 
-        "Description"
-    ])
-    
     print("⏰ BREAKOUT SCANNER TIME PERIODS SUMMARY")
     print("=" * 100)
     print()
     
     # Print the table
-    print(df.to_string(index=False))
+    print(TIME_PERIODS_TABLE)
     
     print()
     print("=" * 100)
@@ -3,71 +3,16 @@
 Simple Breakout Comparison
 Direct comparison of actual breakout days vs our parameters
 """
-import os
-import sys
 import sqlite3
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Optional, Tuple
 
-# Load environment variables
-try:
-    from dotenv import load_dotenv
-    env_file = Path(__file__).parent / "config" / "api_keys.env"
-    if env_file.exists():
-        load_dotenv(env_file)
-        print("🔑 Loaded API keys from .env file")
-except ImportError:
-    pass
+from _breakout_kernels import buffered_stdout
 
-# Add alpaca directory to path
-ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
-sys.path.insert(0, str(ALPACA_DIR))
-
-try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
-    from alpaca.data.models import Bar
-except ImportError as e:
-    print(f"Error importing modules: {e}")
-    sys.exit(1)
-
-def fetch_historical_data(symbol: str, start_date: datetime, end_date: datetime):
-    """Fetch historical data for a specific symbol and date range"""
-    
-    api_key = os.getenv('ALPACA_API_KEY')
-    secret_key = os.getenv('ALPACA_SECRET_KEY')
-    
-    if not api_key or not secret_key:
-        print("❌ No Alpaca API keys found")
-        return None
-    
-    try:
-        client = StockHistoricalDataClient(api_key, secret_key)
-        
-        # Get more data for better analysis
-        extended_start = start_date - timedelta(days=120)
-        
-        request = StockBarsRequest(
-            symbol_or_symbols=symbol,
-            timeframe=TimeFrame.Day,
-            start=extended_start,
-            end=end_date
-        )
-        
-        bars = client.get_stock_bars(request)
-        
-        if bars and symbol in bars.data and bars.data[symbol]:
-            return bars.data[symbol]
-        else:
-            return None
-            
-    except Exception as e:
-        print(f"❌ Error fetching data for {symbol}: {e}")
-        return None
+# Criterion names for the columns of the flag/range criteria matrices
+FLAG_CRITERIA = ('tight_base', 'atr_contraction', 'price_breakout', 'volume_expansion', 'prior_impulse')
+RANGE_CRITERIA = ('tight_base', 'atr_contraction', 'higher_lows', 'price_breakout', 'volume_expansion')
 
 def create_comparison_table():
     """Create a simple comparison table"""
@@ -175,44 +120,41 @@ def create_comparison_table():
     print(f"\n🎯 DETAILED ANALYSIS:")
     print("=" * 120)
     
-    for day in breakout_days:
+    # Score every day at once: one boolean column per criterion, in print order
+    range_pct, atr_ratio, higher_lows_pct, volume_multiple, breakout_distance = np.array(
+        [[day['range_pct'], day['atr_ratio'], day['higher_lows_pct'],
+          day['volume_multiple'], day['breakout_distance']] for day in breakout_days],
+        dtype=float).T
+    prior_impulse = np.array([day['prior_impulse'] for day in breakout_days], dtype=bool)
+    tight_base = range_pct <= 25.0
+    atr_contraction = atr_ratio <= 1.2  # UPDATED: Both use 1.2 threshold
+    volume_expansion = volume_multiple >= 1.5
+    
+    # Flag breakout criteria (higher lows is OPTIONAL)
+    flag_criteria = np.column_stack([
+        tight_base, atr_contraction, breakout_distance >= 1.0, volume_expansion, prior_impulse])
+    # Range breakout criteria (higher lows is REQUIRED)
+    range_criteria = np.column_stack([
+        tight_base, atr_contraction, higher_lows_pct >= 50.0, breakout_distance >= 1.5, volume_expansion])
+    flag_scores = flag_criteria.sum(axis=1)
+    range_scores = range_criteria.sum(axis=1)
+    
+    for day, flag_passed, range_passed, flag_score, range_score in zip(
+            breakout_days, flag_criteria, range_criteria, flag_scores, range_scores):
         print(f"\n📊 {day['symbol']} - {day['date']} ({day['type']}):")
         
-        # Check flag breakout criteria (higher lows is OPTIONAL)
-        flag_criteria = {
-            'tight_base': day['range_pct'] <= 25.0,
-            'atr_contraction': day['atr_ratio'] <= 1.2,  # UPDATED: Both use 1.2 threshold
-            'price_breakout': day['breakout_distance'] >= 1.0,
-            'volume_expansion': day['volume_multiple'] >= 1.5,
-            'prior_impulse': day['prior_impulse']
-        }
-        
-        # Check range breakout criteria (higher lows is REQUIRED)
-        range_criteria = {
-            'tight_base': day['range_pct'] <= 25.0,
-            'atr_contraction': day['atr_ratio'] <= 1.2,  # UPDATED: Both use 1.2 threshold
-            'higher_lows': day['higher_lows_pct'] >= 50.0,  # Required for Range
-            'price_breakout': day['breakout_distance'] >= 1.5,
-            'volume_expansion': day['volume_multiple'] >= 1.5
-        }
-        
-        flag_score = sum(flag_criteria.values())
-        range_score = sum(range_criteria.values())
-        
         print(f"   💰 Price: ${day['price']:.2f} | Volume: {day['volume_multiple']:.1f}x | Breakout: {day['breakout_distance']:+.1f}%")
         print(f"   📏 Range: {day['range_pct']:.1f}% | ATR: {day['atr_ratio']:.1f} | Higher Lows: {day['higher_lows_pct']:.1f}%")
         print(f"   🎯 Prior Impulse: {day['impulse_pct']:.1f}% ({'✅' if day['prior_impulse'] else '❌'})")
         
         print(f"   🚩 Flag Breakout Criteria:")
-        for criterion, passed in flag_criteria.items():
-            status = "✅" if passed else "❌"
-            print(f"      {criterion}: {status}")
+        print("\n".join(f"      {criterion}: {'✅' if passed else '❌'}"
+                        for criterion, passed in zip(FLAG_CRITERIA, flag_passed)))
         print(f"   📊 Flag Score: {flag_score}/5")
         
         print(f"   📦 Range Breakout Criteria:")
-        for criterion, passed in range_criteria.items():
-            status = "✅" if passed else "❌"
-            print(f"      {criterion}: {status}")
+        print("\n".join(f"      {criterion}: {'✅' if passed else '❌'}"
+                        for criterion, passed in zip(RANGE_CRITERIA, range_passed)))
         print(f"   📊 Range Score: {range_score}/5")
     
     # Summary
@@ -245,7 +187,9 @@ def main():
     """Main analysis function"""
     
     try:
-        create_comparison_table()
+        # The report is a few hundred short lines; emit it with a single write
+        with buffered_stdout():
+            create_comparison_table()
         print(f"\n✅ Breakout parameters comparison completed!")
         
     except Exception as e:
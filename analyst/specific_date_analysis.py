@@ -9,72 +9,75 @@ import sqlite3
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
-# Load environment variables
-try:
-    from dotenv import load_dotenv
-    env_file = Path(__file__).parent / "config" / "api_keys.env"
-    if env_file.exists():
-        load_dotenv(env_file)
-        print("🔑 Loaded API keys from .env file")
-except ImportError:
-    pass
-
-# Add alpaca directory to path
-ALPACA_DIR = Path(__file__).parent / "input" / "alpaca"
-sys.path.insert(0, str(ALPACA_DIR))
+# Load API keys and put the Alpaca SDK on the path (once per process)
+from _env import ensure_ready
+ensure_ready()
 
 # Add breakout scanner to path
 sys.path.insert(0, str(Path(__file__).parent / "breakout"))
 
 try:
-    from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
-    from alpaca.data.timeframe import TimeFrame
     from alpaca.data.models import Bar
-    from breakout_scanner_updated import detect_flag_breakout_setup, detect_range_breakout_setup
+    from breakout_scanner_updated import breakout_series, detect_flag_breakout_setup, detect_range_breakout_setup
     from breakout_scanner import SetupTag
 except ImportError as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
 
-def fetch_historical_data(symbol: str, start_date: datetime, end_date: datetime):
-    """Fetch historical data for a specific symbol and date range"""
+from _breakout_kernels import bars_to_soa, write_json
+from _data import get_client, load_bars_batch
+
+# Extra history fetched before each analysis window
+LOOKBACK = timedelta(days=120)
+
+def fetch_historical_data_batch(symbols: List[str], start_date: datetime, end_date: datetime) -> Dict[str, List[Bar]]:
+    """Fetch historical data for several symbols sharing a date range in one request"""
     
     api_key = os.getenv('ALPACA_API_KEY')
     secret_key = os.getenv('ALPACA_SECRET_KEY')
     
     if not api_key or not secret_key:
         print("❌ No Alpaca API keys found")
-        return None
+        return {}
     
     try:
-        client = StockHistoricalDataClient(api_key, secret_key)
-        
         # Get more data for better analysis
-        extended_start = start_date - timedelta(days=120)
-        
-        request = StockBarsRequest(
-            symbol_or_symbols=symbol,
-            timeframe=TimeFrame.Day,
-            start=extended_start,
-            end=end_date
-        )
+        extended_start = start_date - LOOKBACK
         
-        bars = client.get_stock_bars(request)
+        # Served from the on-disk bar cache when this window was fetched before
+        data = load_bars_batch(symbols, extended_start, end_date)
         
-        if bars and symbol in bars.data and bars.data[symbol]:
-            print(f"📊 Fetched {len(bars.data[symbol])} bars for {symbol}")
-            return bars.data[symbol]
-        else:
-            print(f"❌ No data found for {symbol}")
-            return None
+        results = {}
+        for symbol in symbols:
+            if data.get(symbol):
+                print(f"📊 Fetched {len(data[symbol])} bars for {symbol}")
+                results[symbol] = data[symbol]
+            else:
+                print(f"❌ No data found for {symbol}")
+        return results
             
     except Exception as e:
-        print(f"❌ Error fetching data for {symbol}: {e}")
-        return None
+        print(f"❌ Error fetching data for {', '.join(symbols)}: {e}")
+        return {}
+
+def fetch_historical_data(symbol: str, start_date: datetime, end_date: datetime):
+    """Fetch historical data for a specific symbol and date range"""
+    return fetch_historical_data_batch([symbol], start_date, end_date).get(symbol)
+
+def prefetch_historical_data(jobs: List[Tuple[str, datetime, datetime]]):
+    """Warm the bar cache for independent (symbol, start, end) jobs concurrently
+
+    The requests are network-bound, so they run in threads; failures are left
+    for fetch_historical_data to report when each job is analyzed.
+    """
+    get_client()  # build the shared client before the worker threads need it
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        for symbol, start_date, end_date in jobs:
+            pool.submit(load_bars_batch, [symbol], start_date - LOOKBACK, end_date)
 
 def analyze_specific_date(bars: List[Bar], symbol: str, target_date: datetime):
     """Analyze breakout patterns for a specific date"""
@@ -85,15 +88,13 @@ def analyze_specific_date(bars: List[Bar], symbol: str, target_date: datetime):
     
     print(f"\n🔍 Analyzing {symbol} for {target_date.date()}...")
     
-    # Find bars up to and including the target date
-    bars_up_to_date = []
-    target_bar = None
-    
-    for bar in bars:
-        if bar.timestamp.date() <= target_date.date():
-            bars_up_to_date.append(bar)
-            if bar.timestamp.date() == target_date.date():
-                target_bar = bar
+    # Find bars up to and including the target date: bars arrive in timestamp
+    # order, so that is the prefix ending at a single searchsorted
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    target_day = np.datetime64(target_date.date())
+    end = int(np.searchsorted(dates, target_day, side='right'))
+    bars_up_to_date = bars[:end]
+    target_bar = bars[end - 1] if end and dates[end - 1] == target_day else None
     
     if not target_bar:
         print(f"❌ No data found for {target_date.date()}")
@@ -106,6 +107,10 @@ def analyze_specific_date(bars: List[Bar], symbol: str, target_date: datetime):
     print(f"📊 Using {len(bars_up_to_date)} bars for analysis")
     print(f"📅 Target date bar: {target_date.date()} - ${target_bar.close:.2f}")
     
+    # Share the derived series between both detectors
+    series = breakout_series(highs[:end], lows[:end], closes[:end], volumes[:end],
+                             atr_len=14, atr_ma=50, vol_ma=50, base_len=20)
+    
     # Check flag breakout
     flag_setup = detect_flag_breakout_setup(
         bars=bars_up_to_date,
@@ -120,7 +125,8 @@ def analyze_specific_date(bars: List[Bar], symbol: str, target_date: datetime):
         min_break_above_pct=1.0,
         vol_ma=50,
         vol_mult=1.5,
-        use_market_filter=False
+        use_market_filter=False,
+        series=series
     )
     
     # Check range breakout
@@ -137,7 +143,8 @@ def analyze_specific_date(bars: List[Bar], symbol: str, target_date: datetime):
         min_break_above_pct=1.5,
         vol_ma=50,
         vol_mult=1.5,
-        use_market_filter=False
+        use_market_filter=False,
+        series=series
     )
     
     return {
@@ -159,11 +166,13 @@ def analyze_date_range(bars: List[Bar], symbol: str, start_date: datetime, end_d
     
     print(f"\n🔍 Analyzing {symbol} from {start_date.date()} to {end_date.date()}...")
     
-    # Find bars in the date range
-    range_bars = []
-    for bar in bars:
-        if start_date.date() <= bar.timestamp.date() <= end_date.date():
-            range_bars.append(bar)
+    # Bars arrive in timestamp order, so the history up to any day is a
+    # prefix of `bars` whose end is found with a single searchsorted
+    dates, highs, lows, closes, volumes = bars_to_soa(bars)
+    in_range = np.flatnonzero(
+        (dates >= np.datetime64(start_date.date())) & (dates <= np.datetime64(end_date.date()))
+    )
+    range_bars = [bars[i] for i in in_range]
     
     if len(range_bars) < 5:
         print(f"❌ Insufficient data in date range: {len(range_bars)} bars")
@@ -173,12 +182,16 @@ def analyze_date_range(bars: List[Bar], symbol: str, start_date: datetime, end_d
     
     # Analyze each day in the range
     daily_results = []
+    ends = np.searchsorted(dates, dates[in_range], side='right')
     
-    for bar in range_bars:
-        bar_date = bar.timestamp.date()
-        
+    # ATR/volume series are causal, so compute them once over all bars and
+    # hand each day's detectors the prefix views instead of recomputing
+    series = breakout_series(highs, lows, closes, volumes, atr_len=14, atr_ma=50, vol_ma=50, base_len=20)
+    
+    for bar, bar_date, end in zip(range_bars, dates[in_range].astype(str).tolist(), ends):
         # Get bars up to this date
-        bars_up_to_date = [b for b in bars if b.timestamp.date() <= bar_date]
+        bars_up_to_date = bars[:end]
+        series_up_to_date = {name: values[:end] for name, values in series.items()}
         
         if len(bars_up_to_date) < 60:
             continue
@@ -197,7 +210,8 @@ def analyze_date_range(bars: List[Bar], symbol: str, start_date: datetime, end_d
             min_break_above_pct=1.0,
             vol_ma=50,
             vol_mult=1.5,
-            use_market_filter=False
+            use_market_filter=False,
+            series=series_up_to_date
         )
         
         # Check range breakout
@@ -214,11 +228,12 @@ def analyze_date_range(bars: List[Bar], symbol: str, start_date: datetime, end_d
             min_break_above_pct=1.5,
             vol_ma=50,
             vol_mult=1.5,
-            use_market_filter=False
+            use_market_filter=False,
+            series=series_up_to_date
         )
         
         daily_results.append({
-            'date': bar_date.isoformat(),
+            'date': bar_date,
             'price': float(bar.close),
             'volume': int(bar.volume),
             'flag_breakout': flag_setup,
@@ -233,6 +248,25 @@ def analyze_date_range(bars: List[Bar], symbol: str, start_date: datetime, end_d
         'daily_results': daily_results
     }
 
+# (meta key, label, %-format) of the detector metadata shown for each setup
+_FLAG_META_FIELDS = (
+    ('impulse_pct', '📊 Prior Impulse', '%.1f%%'),
+    ('atr_ratio', '📏 ATR Contraction', '%.3f'),
+    ('higher_lows', '🚩 Higher Lows', '%s'),
+)
+_RANGE_META_FIELDS = (
+    ('tight_base', '📏 Tight Base', '%s'),
+    ('range_pct', '📊 Range Pct', '%.1f%%'),
+    ('volume_mult', '📈 Volume Multiple', '%.1fx'),
+)
+
+def _format_meta(meta: Dict, fields) -> str:
+    """Indented metadata lines; missing or None values show as N/A"""
+    return "\n".join(
+        f"      {label}: " + ('N/A' if meta.get(key) is None else fmt % meta[key])
+        for key, label, fmt in fields
+    )
+
 def display_results(results: Dict, analysis_type: str):
     """Display analysis results"""
     
@@ -258,11 +292,9 @@ def display_results(results: Dict, analysis_type: str):
             print(f"   🚩 Flag Breakout: ✅ DETECTED!")
             print(f"      📊 Score: {flag.score:.3f}")
             print(f"      📊 Triggered: {flag.triggered}")
-            if hasattr(flag, 'meta') and flag.meta:
-                meta = flag.meta
-                print(f"      📊 Prior Impulse: {meta.get('impulse_pct', 'N/A'):.1f}%")
-                print(f"      📏 ATR Contraction: {meta.get('atr_contraction', 'N/A'):.3f}")
-                print(f"      🚩 Higher Lows: {meta.get('higher_lows_count', 'N/A')}")
+            meta = getattr(flag, 'meta', None)
+            if meta:
+                print(_format_meta(meta, _FLAG_META_FIELDS))
         else:
             print(f"   🚩 Flag Breakout: ❌ Not detected")
         
@@ -271,11 +303,9 @@ def display_results(results: Dict, analysis_type: str):
             print(f"   📦 Range Breakout: ✅ DETECTED!")
             print(f"      📊 Score: {range_brk.score:.3f}")
             print(f"      📊 Triggered: {range_brk.triggered}")
-            if hasattr(range_brk, 'meta') and range_brk.meta:
-                meta = range_brk.meta
-                print(f"      📏 Tight Base: {meta.get('tight_base', 'N/A')}")
-                print(f"      📊 Range Pct: {meta.get('range_pct', 'N/A'):.1f}%")
-                print(f"      📈 Volume Multiple: {meta.get('volume_mult', 'N/A'):.1f}x")
+            meta = getattr(range_brk, 'meta', None)
+            if meta:
+                print(_format_meta(meta, _RANGE_META_FIELDS))
         else:
             print(f"   📦 Range Breakout: ❌ Not detected")
     
@@ -310,36 +340,41 @@ def main():
     print("Checking specific dates for breakout patterns")
     print("=" * 80)
     
+    apps_date = datetime(2020, 7, 31)
+    codx_start, codx_end = datetime(2020, 2, 1), datetime(2020, 2, 29)
+    
+    # The two windows differ, so they cannot share one request; fetch both
+    # concurrently up front and let each analysis below read its bars back
+    # from the cache, keeping the report in order
+    if os.getenv('ALPACA_API_KEY') and os.getenv('ALPACA_SECRET_KEY'):
+        prefetch_historical_data([('APPS', apps_date, apps_date), ('CODX', codx_start, codx_end)])
+    
     # APPS July 31st analysis
     print(f"\n📊 Fetching data for APPS July 31st, 2020...")
-    apps_bars = fetch_historical_data('APPS', datetime(2020, 7, 31), datetime(2020, 7, 31))
+    apps_bars = fetch_historical_data('APPS', apps_date, apps_date)
     
     if apps_bars:
-        apps_results = analyze_specific_date(apps_bars, 'APPS', datetime(2020, 7, 31))
+        apps_results = analyze_specific_date(apps_bars, 'APPS', apps_date)
         if apps_results:
             display_results(apps_results, "specific_date")
             
             # Save results
             results_file = Path(__file__).parent / "apps_july_31_2020_results.json"
-            import json
-            with open(results_file, 'w') as f:
-                json.dump(apps_results, f, indent=2, default=str)
+            write_json(results_file, apps_results)
             print(f"\n💾 Results saved to: {results_file}")
     
     # CODX February 2020 analysis
     print(f"\n📊 Fetching data for CODX February 2020...")
-    codx_bars = fetch_historical_data('CODX', datetime(2020, 2, 1), datetime(2020, 2, 29))
+    codx_bars = fetch_historical_data('CODX', codx_start, codx_end)
     
     if codx_bars:
-        codx_results = analyze_date_range(codx_bars, 'CODX', datetime(2020, 2, 1), datetime(2020, 2, 29))
+        codx_results = analyze_date_range(codx_bars, 'CODX', codx_start, codx_end)
         if codx_results:
             display_results(codx_results, "date_range")
             
             # Save results
             results_file = Path(__file__).parent / "codx_february_2020_results.json"
-            import json
-            with open(results_file, 'w') as f:
-                json.dump(codx_results, f, indent=2, default=str)
+            write_json(results_file, codx_results)
             print(f"\n💾 Results saved to: {results_file}")
     
     print(f"\n✅ Specific date analysis completed!")
@@ -2,8 +2,9 @@
 """Simple email test script"""
 import sys
 import os
-from email.mime.text import MIMEText
 import base64
+from email.message import EmailMessage
+from email.policy import SMTP
 
 # Try importing Gmail API dependencies
 try:
@@ -15,6 +16,39 @@ except ImportError as e:
     GMAIL_AVAILABLE = False
     GMAIL_ERROR = str(e)
 
+# Signal emails are always a single plain-text part, so the RFC 2822 message is
+# built from fixed header bytes instead of walking a MIMEText tree
+HEADER_TMPL = (
+    b"To: %b\r\n"
+    b"Subject: %b\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Transfer-Encoding: 8bit\r\n"
+    b"\r\n"
+)
+# Longest subject that still fits one 78-character "Subject: ..." line
+MAX_SUBJECT_LEN = 78 - len("Subject: ")
+
+def build_message(to: str, subject: str, body: str) -> bytes:
+    """Raw RFC 2822 bytes for a plain-text email
+
+    The body is sent as 8-bit UTF-8 with CRLF line endings. Non-ASCII or
+    over-long headers fall back to EmailMessage, which RFC 2047 encodes and
+    folds them; line breaks in either header are rejected outright.
+    """
+    if any(sep in value for value in (to, subject) for sep in '\r\n'):
+        raise ValueError("email header value contains a line break")
+    
+    if not (to + subject).isascii() or len(subject) > MAX_SUBJECT_LEN:
+        message = EmailMessage(policy=SMTP)
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(body)
+        return message.as_bytes()
+    
+    body = body.replace('\r\n', '\n').replace('\n', '\r\n')
+    return HEADER_TMPL % (to.encode('ascii'), subject.encode('ascii')) + body.encode('utf-8')
+
 def test_email_creation():
     """Test creating an email message"""
     print("Testing email creation...")
@@ -22,18 +56,18 @@ def test_email_creation():
     test_body = """$INTC 37.01 +2.1% | ADR 5.6/5%+ | Range Breakout
 $PTON 7.50 +3.2% | ADR 6.8/5%+ | Flag Breakout"""
     
-    message = MIMEText(test_body)
-    message['to'] = "deniz@bora.box"
-    message['subject'] = "Test Signal"
+    to = "deniz@bora.box"
+    subject = "Test Signal"
+    message = build_message(to, subject, test_body)
     
     print("\n✅ Email message created successfully!")
     print("\nMessage details:")
-    print(f"To: {message['to']}")
-    print(f"Subject: {message['subject']}")
+    print(f"To: {to}")
+    print(f"Subject: {subject}")
     print(f"\nBody:\n{test_body}")
     
     if GMAIL_AVAILABLE:
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        raw = base64.urlsafe_b64encode(message).decode()
         print(f"\n✅ Message encoded for Gmail API")
         return True
     else: